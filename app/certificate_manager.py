@@ -2,9 +2,15 @@
 Certificate management and format conversion
 """
 import os
+import re
+import functools
+import shutil
+import stat
+import threading
 import logging
-from pathlib import Path
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Union
 from cryptography import x509
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
@@ -12,6 +18,52 @@ from cryptography.hazmat.primitives.serialization import pkcs12
 
 logger = logging.getLogger(__name__)
 
+# Resolve the cryptography backend and PEM loaders once at import
+_BACKEND = default_backend()
+_load_pem_cert = x509.load_pem_x509_certificate
+_load_pem_certs = x509.load_pem_x509_certificates
+_load_pem_key = serialization.load_pem_private_key
+
+# Shared pool for writing the individual files of a name concurrently; the
+# only thread pool used for certificate writes. Its tasks never submit further
+# work, so callers on other pools (e.g. the per-domain sync) can wait on it.
+_FILE_WRITE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cert-write')
+
+# File extensions reported by list_certificates
+_CERTIFICATE_EXTENSIONS = frozenset(('.pem', '.key', '.crt', '.pfx'))
+
+# Matches a single PEM certificate block, delimiters included. Lazy DOTALL
+# matching keeps CRLF line endings and stray whitespace inside the block.
+_PEM_CERT_RE = re.compile(rb'-----BEGIN CERTIFICATE-----.*?-----END CERTIFICATE-----', re.DOTALL)
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_chain_cached(cert_chain: bytes) -> Tuple[x509.Certificate, ...]:
+    """
+    Parse every certificate in a PEM chain, memoized on the chain bytes
+    
+    Scheduled runs re-download the same chain until the certificate is
+    renewed, so repeated syncs reuse the parsed objects.
+    
+    Args:
+        cert_chain: Full certificate chain in PEM format
+        
+    Returns:
+        Tuple of parsed certificates in chain order
+    """
+    # Parse the whole chain in one call, falling back to per-block
+    # parsing so a single malformed block doesn't drop the others
+    try:
+        return tuple(_load_pem_certs(cert_chain))
+    except ValueError:
+        chain_certs = []
+        for block in _PEM_CERT_RE.findall(cert_chain):
+            try:
+                chain_certs.append(_load_pem_cert(block, _BACKEND))
+            except ValueError:
+                continue
+        return tuple(chain_certs)
+
 
 class CertificateManager:
     """Manages certificate storage and format conversion"""
@@ -26,36 +78,55 @@ class CertificateManager:
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
     
-    def _extract_intermediary_certs(self, cert_chain: str) -> str:
+    def _parse_chain(self, cert_chain: bytes) -> Tuple[List[x509.Certificate], List[bytes]]:
         """
-        Extract intermediary certificates from the full certificate chain.
-        The chain typically contains: leaf cert + intermediate(s) + root (optional)
-        We want to extract everything except the first certificate.
+        Split a certificate chain into PEM blocks and parse each one once.
+        The results are shared by the intermediary extraction and every PFX
+        conversion so the same chain is never parsed more than once per save,
+        and parsed certificates are cached across saves of an unchanged chain.
         
         Args:
             cert_chain: Full certificate chain in PEM format
             
         Returns:
-            Intermediary certificates as a PEM string (empty if none found)
+            Tuple of (parsed certificates, PEM blocks) in chain order
         """
         # Split the chain into individual certificates
-        certs = []
-        chain_parts = cert_chain.split('-----BEGIN CERTIFICATE-----')
+        pem_blocks = _PEM_CERT_RE.findall(cert_chain)
         
-        for part in chain_parts[1:]:  # Skip the first empty part
-            cert_data = '-----BEGIN CERTIFICATE-----' + part
-            if '-----END CERTIFICATE-----' in cert_data:
-                certs.append(cert_data.strip())
+        chain_certs = list(_parse_chain_cached(cert_chain))
+        
+        return chain_certs, pem_blocks
+    
+    def _extract_intermediary_certs(self, pem_blocks: List[bytes]) -> List[bytes]:
+        """
+        Extract intermediary certificates from the full certificate chain.
+        The chain typically contains: leaf cert + intermediate(s) + root (optional)
+        We want to extract everything except the first certificate.
         
-        # Return all certificates except the first one (leaf certificate)
-        if len(certs) > 1:
-            intermediary = '\n'.join(certs[1:])
+        Args:
+            pem_blocks: Individual PEM blocks of the chain, as returned by _parse_chain
+            
+        Returns:
+            Intermediary certificates as a list of PEM buffers to be written
+            back to back (empty if none found)
+        """
+        # Return all certificates except the first one (leaf certificate),
+        # separated by the chain's own line ending so CRLF input stays CRLF.
+        # The pieces are gather-written, so they are never joined in memory.
+        if len(pem_blocks) > 1:
+            newline = b'\r\n' if b'\r\n' in pem_blocks[1] else b'\n'
+            intermediary = [pem_blocks[1]]
+            for block in pem_blocks[2:]:
+                intermediary.append(newline)
+                intermediary.append(block)
             return intermediary
         else:
-            return ""
+            return []
     
-    def save_certificate(self, domain: str, cert_chain: str, private_key: str, 
-                        public_key: str, custom_name: str = None,
+    def save_certificate(self, domain: str, cert_chain: Union[bytes, str],
+                        private_key: Union[bytes, str], public_key: Union[bytes, str],
+                        custom_name: str = None,
                         formats: List[str] = None, separator: str = "_",
                         alt_file_names: List[str] = None) -> Dict[str, str]:
         """
@@ -63,9 +134,9 @@ class CertificateManager:
         
         Args:
             domain: Domain name
-            cert_chain: Certificate chain (PEM format)
-            private_key: Private key (PEM format)
-            public_key: Public key/certificate (PEM format)
+            cert_chain: Certificate chain (PEM bytes; str is encoded once)
+            private_key: Private key (PEM bytes; str is encoded once)
+            public_key: Public key/certificate (PEM bytes; str is encoded once)
             custom_name: Custom name for files (defaults to domain)
             formats: List of formats to save (pem, crt, key, pfx)
             separator: Separator for file names (_, -, or .)
@@ -83,136 +154,413 @@ class CertificateManager:
         name = custom_name or domain
         saved_files = {}
         
-        # Extract intermediary certificates from the chain
-        intermediary_certs = self._extract_intermediary_certs(cert_chain)
+        # Work on bytes throughout; the API client already returns bytes,
+        # so this only encodes for callers still passing str
+        if isinstance(cert_chain, str):
+            cert_chain = cert_chain.encode()
+        if isinstance(private_key, str):
+            private_key = private_key.encode()
+        if isinstance(public_key, str):
+            public_key = public_key.encode()
         
-        # Build list of all names to save (primary + alternatives)
-        all_names = [name] + alt_file_names
+        # Parse the chain once and extract intermediary certificates from it
+        chain_certs, pem_blocks = self._parse_chain(cert_chain)
+        intermediary_certs = self._extract_intermediary_certs(pem_blocks)
+        
+        # Parse the PFX inputs once rather than once per file name
+        pfx_material = None
+        if "pfx" in formats:
+            pfx_material = self._load_pfx_material(public_key, private_key, chain_certs)
+        
+        # Primary + alternative names, without duplicates (order preserved)
+        names = list(dict.fromkeys([name, *alt_file_names]))
+        if len(names) != 1 + len(alt_file_names):
+            logger.warning(
+                f"Ignoring {1 + len(alt_file_names) - len(names)} duplicate file name(s) for {domain}; "
+                "check custom_name and alt_file_names in the domain configuration"
+            )
         
         try:
-            for file_name in all_names:
-                # Always save PEM format components
-                if "pem" in formats:
-                    # Use default naming pattern
-                    fullchain_filename = f"{file_name}{separator}fullchain.pem"
-                    key_filename = f"{file_name}{separator}private.key"
-                    cert_filename = f"{file_name}{separator}cert.pem"
-                    chain_filename = f"{file_name}{separator}chain.pem"
-                    
-                    # Save full chain
-                    fullchain_path = os.path.join(self.output_dir, fullchain_filename)
-                    with open(fullchain_path, 'w') as f:
-                        f.write(cert_chain)
-                    saved_files[f'{file_name}_fullchain'] = fullchain_path
-                    
-                    # Save private key
-                    key_path = os.path.join(self.output_dir, key_filename)
-                    with open(key_path, 'w') as f:
-                        f.write(private_key)
-                    saved_files[f'{file_name}_private_key'] = key_path
-                    
-                    # Save certificate
-                    cert_path = os.path.join(self.output_dir, cert_filename)
-                    with open(cert_path, 'w') as f:
-                        f.write(public_key)
-                    saved_files[f'{file_name}_certificate'] = cert_path
-                    
-                    # Save intermediary certificate chain (if any)
-                    if intermediary_certs:
-                        chain_path = os.path.join(self.output_dir, chain_filename)
-                        with open(chain_path, 'w') as f:
-                            f.write(intermediary_certs)
-                        saved_files[f'{file_name}_chain'] = chain_path
-                        logger.info(f"Saved intermediary certificates to {chain_filename}")
-                
-                # Save as separate .crt and .key files
-                if "crt" in formats:
-                    crt_path = os.path.join(self.output_dir, f"{file_name}.crt")
-                    with open(crt_path, 'w') as f:
-                        f.write(cert_chain)
-                    saved_files[f'{file_name}_crt'] = crt_path
-                
-                if "key" in formats:
-                    key_path = os.path.join(self.output_dir, f"{file_name}.key")
-                    with open(key_path, 'w') as f:
-                        f.write(private_key)
-                    saved_files[f'{file_name}_key'] = key_path
-                
-                # Convert to PFX/PKCS12 format
-                if "pfx" in formats:
-                    pfx_path = self._convert_to_pfx(file_name, public_key, private_key, cert_chain)
-                    if pfx_path:
-                        saved_files[f'{file_name}_pfx'] = pfx_path
-            
-            logger.info(f"Saved certificates for {domain} as {name} (with {len(alt_file_names)} alternative names)")
+            # Names are emitted one after another; each name's files are
+            # already written concurrently on the shared write pool
+            emit = functools.partial(
+                self._emit_files,
+                separator=separator,
+                formats=formats,
+                cert_chain=cert_chain,
+                private_key=private_key,
+                public_key=public_key,
+                intermediary_certs=intermediary_certs,
+                pfx_material=pfx_material
+            )
+            
+            for file_name in names:
+                saved_files.update(emit(file_name))
+            
+            if intermediary_certs and "pem" in formats:
+                logger.info(f"Saved intermediary certificates for {len(names)} file names")
+            
+            logger.info(f"Saved certificates for {domain} as {name} (with {len(names) - 1} alternative names)")
             return saved_files
             
         except Exception as e:
             logger.error(f"Failed to save certificates for {domain}: {e}")
             raise
     
-    def _convert_to_pfx(self, name: str, cert_pem: str, key_pem: str, 
-                       chain_pem: str, password: str = "") -> str:
+    def get_current_files(self, domain: str, custom_name: str = None,
+                          formats: List[str] = None, separator: str = "_",
+                          alt_file_names: List[str] = None,
+                          min_validity: timedelta = timedelta(0)) -> Optional[Dict[str, str]]:
         """
-        Convert PEM certificates to PFX/PKCS12 format
+        Get the files saved earlier for a domain if they don't need refreshing
         
-        SECURITY NOTE: PFX files are created without password protection by default.
-        This means the private key is not encrypted in the PFX file.
-        Users should secure the certificate directory with appropriate file permissions.
+        Args:
+            domain: Domain name
+            custom_name: Custom name for files (defaults to domain)
+            formats: List of formats saved (pem, crt, key, pfx)
+            separator: Separator for file names (_, -, or .)
+            alt_file_names: Alternative file name variants saved
+            min_validity: How long the saved certificate must remain valid
+            
+        Returns:
+            Dictionary mapping format to file path as returned by save_certificate,
+            or None if any file is missing or the certificate expires too soon
+        """
+        if formats is None:
+            formats = ["pem"]
+        
+        name = custom_name or domain
+        join = os.path.join
+        output_dir = self.output_dir
+        files = {}
+        
+        for file_name in dict.fromkeys([name, *(alt_file_names or [])]):
+            expected = []
+            if "pem" in formats:
+                expected.append((f'{file_name}_fullchain', f"{file_name}{separator}fullchain.pem"))
+                expected.append((f'{file_name}_private_key', f"{file_name}{separator}private.key"))
+                expected.append((f'{file_name}_certificate', f"{file_name}{separator}cert.pem"))
+            if "crt" in formats:
+                expected.append((f'{file_name}_crt', f"{file_name}.crt"))
+            if "key" in formats:
+                expected.append((f'{file_name}_key', f"{file_name}.key"))
+            if "pfx" in formats:
+                expected.append((f'{file_name}_pfx', f"{file_name}.pfx"))
+            
+            for key, file in expected:
+                path = join(output_dir, file)
+                if not os.path.isfile(path):
+                    return None
+                files[key] = path
+            
+            # The chain file only exists when the chain has intermediates
+            if "pem" in formats:
+                chain_path = join(output_dir, f"{file_name}{separator}chain.pem")
+                if os.path.isfile(chain_path):
+                    files[f'{file_name}_chain'] = chain_path
+        
+        # Both files start with the leaf certificate
+        cert_file = files.get(f'{name}_certificate') or files.get(f'{name}_crt')
+        if not cert_file:
+            return None
+        try:
+            with open(cert_file, 'rb') as f:
+                not_after = _load_pem_cert(f.read(), _BACKEND).not_valid_after_utc
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read saved certificate {cert_file}: {e}")
+            return None
+        
+        if not_after - datetime.now(timezone.utc) <= min_validity:
+            return None
+        return files
+    
+    def _emit_files(self, file_name: str, separator: str, formats: List[str],
+                    cert_chain: bytes, private_key: bytes, public_key: bytes,
+                    intermediary_certs: List[bytes], pfx_material: Optional[Tuple]) -> Dict[str, str]:
+        """
+        Write all requested formats for a single file name
         
         Args:
-            name: Base name for output file
-            cert_pem: Certificate in PEM format (or empty if should extract from chain)
-            key_pem: Private key in PEM format
-            chain_pem: Certificate chain in PEM format
-            password: Password for PFX file (empty by default for compatibility)
+            file_name: Base name for the output files
+            separator: Separator for file names (_, -, or .)
+            formats: List of formats to save (pem, crt, key, pfx)
+            cert_chain: Certificate chain PEM bytes
+            private_key: Private key PEM bytes
+            public_key: Certificate PEM bytes
+            intermediary_certs: Intermediary certificate PEM buffers (may be empty)
+            pfx_material: Parsed PFX inputs from _load_pfx_material, or None
             
         Returns:
-            Path to PFX file
+            Dictionary mapping file key to file path for this name
+        """
+        output_dir = self.output_dir
+        join = os.path.join
+        save_pem = "pem" in formats
+        saved_files = {}
+        
+        # Collect (path, content) pairs and write them in one pass;
+        # files identical to one already written are hardlinked instead
+        writes = []
+        links = []
+        
+        # Always save PEM format components
+        if save_pem:
+            # Save full chain
+            fullchain_path = join(output_dir, f"{file_name}{separator}fullchain.pem")
+            writes.append((fullchain_path, cert_chain))
+            saved_files[f'{file_name}_fullchain'] = fullchain_path
+            
+            # Save private key
+            private_key_path = join(output_dir, f"{file_name}{separator}private.key")
+            writes.append((private_key_path, private_key))
+            saved_files[f'{file_name}_private_key'] = private_key_path
+            
+            # Save certificate
+            cert_path = join(output_dir, f"{file_name}{separator}cert.pem")
+            writes.append((cert_path, public_key))
+            saved_files[f'{file_name}_certificate'] = cert_path
+            
+            # Save intermediary certificate chain (if any)
+            if intermediary_certs:
+                chain_path = join(output_dir, f"{file_name}{separator}chain.pem")
+                writes.append((chain_path, intermediary_certs))
+                saved_files[f'{file_name}_chain'] = chain_path
+        
+        # Save as separate .crt and .key files
+        if "crt" in formats:
+            crt_path = join(output_dir, f"{file_name}.crt")
+            if save_pem:
+                links.append((fullchain_path, crt_path))
+            else:
+                writes.append((crt_path, cert_chain))
+            saved_files[f'{file_name}_crt'] = crt_path
+        
+        if "key" in formats:
+            key_path = join(output_dir, f"{file_name}.key")
+            if save_pem:
+                links.append((private_key_path, key_path))
+            else:
+                writes.append((key_path, private_key))
+            saved_files[f'{file_name}_key'] = key_path
+        
+        self._bulk_write(writes)
+        for src, dst in links:
+            self._link_or_copy(src, dst)
+        
+        # Convert to PFX/PKCS12 format
+        if pfx_material:
+            pfx_path = self._convert_to_pfx(file_name, *pfx_material)
+            if pfx_path:
+                saved_files[f'{file_name}_pfx'] = pfx_path
+        
+        return saved_files
+    
+    def _temp_path(self, path: str) -> str:
+        """Return a sibling temp path unique to the calling thread"""
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    
+    def _bulk_write(self, writes: List[Tuple[str, Union[bytes, List[bytes]]]]):
+        """
+        Write file contents with raw os-level calls
+        
+        Files whose current contents already match are left untouched, so
+        unchanged certificates keep their mtime and don't trigger watchers.
+        Skips Python's buffered text layer: each file is one open, one
+        gather write of all its buffers (looped on short writes) and one
+        close, with separate files written concurrently. Data goes to a temp
+        file that is then renamed over the target, so readers never see a
+        partially written file. There is deliberately no fsync; a crash
+        leaves the previous file in place and the next sync rewrites it.
+        
+        Args:
+            writes: List of (path, content) pairs; content is bytes or a
+                    list of buffers written back to back
+        """
+        if len(writes) > 1:
+            # Files are independent; keep several writes in flight at once
+            for _ in _FILE_WRITE_POOL.map(self._write_file, writes):
+                pass
+        else:
+            for item in writes:
+                self._write_file(item)
+    
+    def _write_file(self, write: Tuple[str, Union[bytes, List[bytes]]]):
+        """
+        Atomically replace one file, unless it already has the same contents
+        
+        A replaced file keeps its permissions and, where allowed, its owner;
+        new files get the process umask default, as with a plain open().
+        
+        Args:
+            write: (path, content) pair; content is bytes or a list of buffers
+        """
+        path, data = write
+        buffers = [data] if isinstance(data, bytes) else data
+        if self._file_matches(path, buffers):
+            return
+        
+        try:
+            existing = os.stat(path)
+        except OSError:
+            existing = None
+        
+        tmp_path = self._temp_path(path)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            try:
+                if existing is not None:
+                    # The umask applied at creation; set the exact mode
+                    os.fchmod(fd, stat.S_IMODE(existing.st_mode))
+                    if (existing.st_uid, existing.st_gid) != (os.getuid(), os.getgid()):
+                        try:
+                            os.fchown(fd, existing.st_uid, existing.st_gid)
+                        except PermissionError:
+                            logger.warning(f"Could not keep the owner of {path}")
+                self._write_buffers(fd, buffers)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _write_buffers(self, fd: int, buffers: List[bytes]):
+        """Write buffers to a file descriptor with os.writev, handling short writes"""
+        views = [memoryview(buffer) for buffer in buffers if buffer]
+        while views:
+            written = os.writev(fd, views)
+            # Drop fully written buffers and trim a partially written one
+            while views and written >= len(views[0]):
+                written -= len(views[0])
+                views.pop(0)
+            if written:
+                views[0] = views[0][written:]
+    
+    def _file_matches(self, path: str, buffers: List[bytes]) -> bool:
+        """Check whether a file exists with exactly the given contents"""
+        try:
+            if os.path.getsize(path) != sum(len(buffer) for buffer in buffers):
+                return False
+            with open(path, 'rb') as f:
+                existing = memoryview(f.read())
+        except OSError:
+            return False
+        
+        offset = 0
+        for buffer in buffers:
+            if existing[offset:offset + len(buffer)] != buffer:
+                return False
+            offset += len(buffer)
+        return offset == len(existing)
+    
+    def _link_or_copy(self, src: str, dst: str):
+        """
+        Hardlink dst to src, copying instead when linking isn't possible
+        (e.g. cross-device or filesystems without hardlink support)
+        
+        Args:
+            src: Existing file path
+            dst: Destination file path (atomically replaced if it exists)
+        """
+        try:
+            if os.path.samefile(src, dst):
+                return
+        except OSError:
+            pass
+        
+        tmp_path = self._temp_path(dst)
+        try:
+            try:
+                os.link(src, tmp_path)
+            except OSError:
+                # Copies the permissions too, so key files stay private
+                shutil.copy(src, tmp_path)
+            os.replace(tmp_path, dst)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _load_pfx_material(self, cert_pem: bytes, key_pem: bytes,
+                           chain_certs: List[x509.Certificate]) -> Optional[Tuple]:
+        """
+        Load the private key and certificates needed for PFX conversion
+        
+        Args:
+            cert_pem: Certificate PEM bytes (or empty if should extract from chain)
+            key_pem: Private key PEM bytes
+            chain_certs: Parsed certificates from the chain, as returned by _parse_chain
+            
+        Returns:
+            Tuple of (private key, certificate, CA certificates), or None on failure
         """
         try:
             # Load the private key
-            key = serialization.load_pem_private_key(
-                key_pem.encode(),
+            key = _load_pem_key(
+                key_pem,
                 password=None,
-                backend=default_backend()
+                backend=_BACKEND
             )
             
             # Try to load the certificate from cert_pem first
             cert = None
             try:
                 if cert_pem and cert_pem.strip():
-                    cert = x509.load_pem_x509_certificate(cert_pem.encode(), default_backend())
+                    cert = _load_pem_cert(cert_pem, _BACKEND)
                     logger.debug("Loaded certificate from cert_pem parameter")
             except Exception as e:
                 logger.debug(f"Could not load certificate from cert_pem: {e}")
             
-            # Parse all certificates from the chain
-            all_chain_certs = []
-            chain_parts = chain_pem.split('-----BEGIN CERTIFICATE-----')
-            for part in chain_parts[1:]:  # Skip the first empty part
-                cert_data = '-----BEGIN CERTIFICATE-----' + part
-                try:
-                    chain_cert = x509.load_pem_x509_certificate(
-                        cert_data.encode(), 
-                        default_backend()
-                    )
-                    all_chain_certs.append(chain_cert)
-                except Exception:
-                    continue
-            
             # If we couldn't load the certificate from cert_pem, use the first one from the chain
             if cert is None:
-                if not all_chain_certs:
+                if not chain_certs:
                     raise ValueError("No valid certificates found in cert_pem or chain_pem")
-                cert = all_chain_certs[0]
-                ca_certs = all_chain_certs[1:] if len(all_chain_certs) > 1 else []
+                cert = chain_certs[0]
+                ca_certs = chain_certs[1:] if len(chain_certs) > 1 else []
                 logger.debug(f"Using first certificate from chain as main certificate, {len(ca_certs)} CA certificates")
             else:
                 # Use all chain certificates as CA certificates
-                ca_certs = all_chain_certs
+                ca_certs = list(chain_certs)
                 logger.debug(f"Using cert_pem as main certificate, {len(ca_certs)} CA certificates from chain")
             
+            return key, cert, ca_certs
+            
+        except Exception as e:
+            logger.error(f"Failed to convert to PFX: {e}")
+            return None
+    
+    def _convert_to_pfx(self, name: str, key, cert: x509.Certificate,
+                       ca_certs: List[x509.Certificate], password: str = "") -> str:
+        """
+        Convert parsed certificates to PFX/PKCS12 format
+        
+        SECURITY NOTE: PFX files are created without password protection by default.
+        This means the private key is not encrypted in the PFX file.
+        Users should secure the certificate directory with appropriate file permissions.
+        
+        Args:
+            name: Base name for output file
+            key: Parsed private key
+            cert: Parsed main certificate
+            ca_certs: Parsed CA certificates to include
+            password: Password for PFX file (empty by default for compatibility)
+            
+        Returns:
+            Path to PFX file
+        """
+        try:
+            pfx_path = os.path.join(self.output_dir, f"{name}.pfx")
+            
+            # PKCS12 output is salted, so compare contents rather than bytes
+            if self._pfx_is_current(pfx_path, key, cert, ca_certs, password):
+                logger.debug(f"PFX file unchanged: {pfx_path}")
+                return pfx_path
+            
             # Create PKCS12
             pfx_data = pkcs12.serialize_key_and_certificates(
                 name.encode(),
@@ -223,9 +571,7 @@ class CertificateManager:
             )
             
             # Save to file
-            pfx_path = os.path.join(self.output_dir, f"{name}.pfx")
-            with open(pfx_path, 'wb') as f:
-                f.write(pfx_data)
+            self._bulk_write([(pfx_path, pfx_data)])
             
             logger.info(f"Created PFX file: {pfx_path}")
             return pfx_path
@@ -234,6 +580,35 @@ class CertificateManager:
             logger.error(f"Failed to convert to PFX: {e}")
             return None
     
+    def _pfx_is_current(self, pfx_path: str, key, cert: x509.Certificate,
+                        ca_certs: List[x509.Certificate], password: str = "") -> bool:
+        """
+        Check whether an existing PFX file already holds the given key and certificates
+        
+        Args:
+            pfx_path: Path to the existing PFX file
+            key: Parsed private key
+            cert: Parsed main certificate
+            ca_certs: Parsed CA certificates
+            password: Password the PFX file was created with
+            
+        Returns:
+            True if the file exists and its contents match
+        """
+        try:
+            with open(pfx_path, 'rb') as f:
+                existing_key, existing_cert, existing_cas = pkcs12.load_key_and_certificates(
+                    f.read(), password.encode() if password else None
+                )
+        except Exception:
+            return False
+        
+        if existing_key is None or existing_cert != cert or list(existing_cas) != list(ca_certs):
+            return False
+        
+        spki = serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+        return existing_key.public_key().public_bytes(*spki) == key.public_key().public_bytes(*spki)
+    
     def list_certificates(self) -> List[str]:
         """
         List all certificate files in output directory
@@ -242,11 +617,14 @@ class CertificateManager:
             List of certificate file paths
         """
         try:
-            files = []
-            for file in os.listdir(self.output_dir):
-                if file.endswith(('.pem', '.key', '.crt', '.pfx')):
-                    files.append(os.path.join(self.output_dir, file))
-            return sorted(files)
+            with os.scandir(self.output_dir) as entries:
+                files = [
+                    entry.path for entry in entries
+                    if os.path.splitext(entry.name)[1] in _CERTIFICATE_EXTENSIONS
+                    and entry.is_file()
+                ]
+            files.sort()
+            return files
         except Exception as e:
             logger.error(f"Failed to list certificates: {e}")
             return []
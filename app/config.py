@@ -2,13 +2,22 @@
 Configuration management for Porkbun Certificate Sync
 """
 import os
+import copy
 import yaml
 import logging
+import threading
 from typing import Dict, List, Optional
-from pathlib import Path
+
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
 
 logger = logging.getLogger(__name__)
 
+# Parsed config files keyed by path: (st_mtime_ns, st_size, config)
+_CONFIG_CACHE: Dict[str, tuple] = {}
+
 
 class Config:
     """Manages application configuration stored in YAML"""
@@ -26,19 +35,42 @@ class Config:
         self.config_path = config_path
         self.config_dir = os.path.dirname(config_path)
         
+        # Batched updates: save() only marks the config dirty while > 0. The
+        # lock is held for the whole batch, so saves from other threads wait
+        # for it instead of being folded into it. Every mutator runs as a
+        # batch of its own, so concurrent requests never interleave changes
+        self._batch_lock = threading.RLock()
+        self._batch_depth = 0
+        self._batch_snapshot: Optional[Dict] = None
+        self._dirty = False
+        
+        # Bumped on every change so callers can cache derived views
+        self.version = 0
+        
+        # Lazily built domain name -> list position index
+        self._domain_index: Optional[Dict[str, int]] = None
+        self._domain_index_list: Optional[List[Dict]] = None
+        
         # Ensure config directory exists
         os.makedirs(self.config_dir, exist_ok=True)
         
         self.config = self._load_config()
     
     def _load_config(self) -> Dict:
-        """Load configuration from YAML file"""
+        """Load configuration from YAML file, reusing the cached parse if unchanged"""
         if os.path.exists(self.config_path):
             try:
+                st = os.stat(self.config_path)
+                cached = _CONFIG_CACHE.get(self.config_path)
+                if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                    logger.debug(f"Using cached configuration for {self.config_path}")
+                    return copy.deepcopy(cached[2])
+                
                 with open(self.config_path, 'r') as f:
-                    config = yaml.safe_load(f) or {}
+                    config = yaml.load(f, Loader=_Loader) or {}
                     logger.info(f"Loaded configuration from {self.config_path}")
-                    return config
+                _CONFIG_CACHE[self.config_path] = (st.st_mtime_ns, st.st_size, copy.deepcopy(config))
+                return config
             except Exception as e:
                 logger.error(f"Failed to load config: {e}")
                 return self._default_config()
@@ -65,11 +97,55 @@ class Config:
             }
         }
     
+    def __enter__(self):
+        """Start a batch of updates that is saved once on exit"""
+        self._batch_lock.acquire()
+        if self._batch_depth == 0:
+            self._batch_snapshot = copy.deepcopy(self.config)
+        self._batch_depth += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        """End a batch of updates, saving if anything changed or rolling back on error"""
+        try:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                snapshot, self._batch_snapshot = self._batch_snapshot, None
+                if exc_type is None:
+                    self.flush()
+                elif self._dirty:
+                    # Don't leave a half-applied batch in memory for the next save
+                    self._dirty = False
+                    self.config = snapshot
+                    self._domain_index = None
+                    self.version += 1
+        finally:
+            self._batch_lock.release()
+        return False
+    
+    def flush(self):
+        """Save configuration if there are pending batched changes"""
+        with self._batch_lock:
+            if self._dirty:
+                self._dirty = False
+                self._write()
+    
     def save(self):
-        """Save configuration to YAML file"""
+        """Save configuration to YAML file (deferred while inside a batch)"""
+        with self._batch_lock:
+            self.version += 1
+            if self._batch_depth > 0:
+                self._dirty = True
+                return
+            self._write()
+    
+    def _write(self):
+        """Write configuration to YAML file"""
         try:
             with open(self.config_path, 'w') as f:
-                yaml.safe_dump(self.config, f, default_flow_style=False, sort_keys=False)
+                yaml.dump(self.config, f, Dumper=_Dumper, default_flow_style=False, sort_keys=False)
+            st = os.stat(self.config_path)
+            _CONFIG_CACHE[self.config_path] = (st.st_mtime_ns, st.st_size, copy.deepcopy(self.config))
             logger.info(f"Saved configuration to {self.config_path}")
         except Exception as e:
             logger.error(f"Failed to save config: {e}")
@@ -82,74 +158,97 @@ class Config:
     
     def set_api_credentials(self, api_key: str, secret_key: str):
         """Set API credentials"""
-        if "api" not in self.config:
-            self.config["api"] = {}
-        self.config["api"]["api_key"] = api_key
-        self.config["api"]["secret_key"] = secret_key
-        self.save()
+        with self:
+            if "api" not in self.config:
+                self.config["api"] = {}
+            self.config["api"]["api_key"] = api_key
+            self.config["api"]["secret_key"] = secret_key
+            self.save()
     
     def get_domains(self) -> List[Dict]:
         """Get list of configured domains"""
         return self.config.get("domains", [])
     
+    def _get_domain_index(self) -> Dict[str, int]:
+        """
+        Get a mapping of domain name to its position in the domains list
+        
+        The index is rebuilt lazily whenever the domains list has been
+        replaced or resized outside of the domain mutators.
+        """
+        domains = self.config.get("domains", [])
+        if (self._domain_index is None or self._domain_index_list is not domains
+                or len(self._domain_index) != len(domains)):
+            self._domain_index = {d.get("domain"): i for i, d in enumerate(domains)}
+            self._domain_index_list = domains
+        return self._domain_index
+    
     def add_domain(self, domain: str, custom_name: Optional[str] = None, 
                    separator: Optional[str] = None, alt_file_names: Optional[List[str]] = None):
         """Add a domain to the configuration"""
-        domains = self.config.get("domains", [])
-        
-        # Check if domain already exists
-        if any(d.get("domain") == domain for d in domains):
-            raise ValueError(f"Domain {domain} already exists")
-        
-        domain_config = {
-            "domain": domain,
-            "custom_name": custom_name or domain,
-            "separator": separator or "_",
-            "alt_file_names": alt_file_names or []
-        }
-        
-        domains.append(domain_config)
-        self.config["domains"] = domains
-        self.save()
+        with self:
+            domains = self.config.setdefault("domains", [])
+            index = self._get_domain_index()
+            
+            # Check if domain already exists
+            if domain in index:
+                raise ValueError(f"Domain {domain} already exists")
+            
+            domain_config = {
+                "domain": domain,
+                "custom_name": custom_name or domain,
+                "separator": separator or "_",
+                "alt_file_names": alt_file_names or []
+            }
+            
+            index[domain] = len(domains)
+            domains.append(domain_config)
+            self.save()
     
     def update_domain(self, original_domain: str, domain: str, custom_name: Optional[str] = None,
                      separator: Optional[str] = None, alt_file_names: Optional[List[str]] = None):
         """Update a domain in the configuration"""
-        domains = self.config.get("domains", [])
-        
-        # Find the domain to update
-        domain_index = None
-        for i, d in enumerate(domains):
-            if d.get("domain") == original_domain:
-                domain_index = i
-                break
-        
-        if domain_index is None:
-            raise ValueError(f"Domain {original_domain} not found")
-        
-        # If domain name is changing, check for duplicates
-        if original_domain != domain:
-            if any(d.get("domain") == domain for d in domains):
-                raise ValueError(f"Domain {domain} already exists")
-        
-        # Update the domain
-        updated_config = {
-            "domain": domain,
-            "custom_name": custom_name or domain,
-            "separator": separator or "_",
-            "alt_file_names": alt_file_names or []
-        }
-        
-        domains[domain_index] = updated_config
-        
-        self.config["domains"] = domains
-        self.save()
+        with self:
+            domains = self.config.setdefault("domains", [])
+            index = self._get_domain_index()
+            
+            # Find the domain to update
+            domain_index = index.get(original_domain)
+            
+            if domain_index is None:
+                raise ValueError(f"Domain {original_domain} not found")
+            
+            # If domain name is changing, check for duplicates
+            if original_domain != domain:
+                if domain in index:
+                    raise ValueError(f"Domain {domain} already exists")
+            
+            # Update the domain
+            updated_config = {
+                "domain": domain,
+                "custom_name": custom_name or domain,
+                "separator": separator or "_",
+                "alt_file_names": alt_file_names or []
+            }
+            
+            domains[domain_index] = updated_config
+            del index[original_domain]
+            index[domain] = domain_index
+            
+            self.save()
     
-    def remove_domain(self, domain: str):
-        """Remove a domain from the configuration"""
-        domains = self.config.get("domains", [])
-        self.config["domains"] = [d for d in domains if d.get("domain") != domain]
-        self.save()
+    def remove_domain(self, domain: str) -> bool:
+        """Remove a domain from the configuration, returning whether it was found"""
+        with self:
+            domains = self.config.setdefault("domains", [])
+            found = domain in self._get_domain_index()
+            if found:
+                # Hand-edited configs can list a domain more than once; drop every copy
+                domains[:] = [d for d in domains if d.get("domain") != domain]
+                # Positions after the removed entries have shifted
+                self._domain_index = None
+            self.save()
+            return found
     
     def get_certificate_config(self) -> Dict:
         """Get certificate configuration"""
@@ -163,17 +262,18 @@ class Config:
                                   naming_format: Optional[str] = None,
                                   formats: Optional[List[str]] = None):
         """Update certificate configuration"""
-        if "certificates" not in self.config:
-            self.config["certificates"] = {}
-        
-        if output_dir is not None:
-            self.config["certificates"]["output_dir"] = output_dir
-        if naming_format is not None:
-            self.config["certificates"]["naming_format"] = naming_format
-        if formats is not None:
-            self.config["certificates"]["formats"] = formats
-        
-        self.save()
+        with self:
+            if "certificates" not in self.config:
+                self.config["certificates"] = {}
+            
+            if output_dir is not None:
+                self.config["certificates"]["output_dir"] = output_dir
+            if naming_format is not None:
+                self.config["certificates"]["naming_format"] = naming_format
+            if formats is not None:
+                self.config["certificates"]["formats"] = formats
+            
+            self.save()
     
     def get_schedule_config(self) -> Dict:
         """Get schedule configuration"""
@@ -184,9 +284,10 @@ class Config:
     
     def update_schedule_config(self, enabled: bool, cron: str):
         """Update schedule configuration"""
-        if "schedule" not in self.config:
-            self.config["schedule"] = {}
-        
-        self.config["schedule"]["enabled"] = enabled
-        self.config["schedule"]["cron"] = cron
-        self.save()
+        with self:
+            if "schedule" not in self.config:
+                self.config["schedule"] = {}
+            
+            self.config["schedule"]["enabled"] = enabled
+            self.config["schedule"]["cron"] = cron
+            self.save()
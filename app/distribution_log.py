@@ -1,30 +1,74 @@
 """
 Distribution logging module
 """
-import json
+import os
+import functools
+import itertools
+import time
+import queue
+import atexit
 import logging
+import threading
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of buffers passed to a single os.writev call
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+
+
+@functools.lru_cache(maxsize=256)
+def _iso_second(epoch_seconds: int) -> str:
+    """Format a whole epoch second as a local ISO timestamp"""
+    return datetime.fromtimestamp(epoch_seconds).isoformat()
+
+
+def _iso_timestamp(ts: int) -> str:
+    """
+    Format epoch microseconds like datetime.isoformat(), reusing the
+    formatted date and time of day for entries within the same second
+    
+    Args:
+        ts: Timestamp in epoch microseconds
+        
+    Returns:
+        Local ISO 8601 timestamp
+    """
+    seconds, micros = divmod(ts, 1_000_000)
+    if micros:
+        return f"{_iso_second(seconds)}.{micros:06d}"
+    return _iso_second(seconds)
+
 
 class DistributionLog:
     """Manages distribution event logging"""
     
+    # Seconds to wait after an event before writing, so bursts share one write
+    FLUSH_DELAY = 0.05
+    
+    # Maximum number of queued entries written in one batch
+    FLUSH_BATCH_SIZE = 128
+    
     def __init__(self, log_file: str = None):
         """
         Initialize distribution log manager
         
         Args:
-            log_file: Path to log file (defaults to /app/config/distribution_log.json)
+            log_file: Path to log file (defaults to /app/config/distribution_log.jsonl)
         """
+        legacy_file = None
         if log_file is None:
-            import os
             config_path = os.environ.get('CONFIG_PATH', '/app/config/config.yaml')
             config_dir = os.path.dirname(config_path)
-            log_file = os.path.join(config_dir, 'distribution_log.json')
+            log_file = os.path.join(config_dir, 'distribution_log.jsonl')
+            legacy_file = os.path.join(config_dir, 'distribution_log.json')
         
         self.log_file = log_file
         self.log_dir = Path(log_file).parent
@@ -32,38 +76,297 @@ class DistributionLog:
         # Ensure log directory exists
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
+        # Convert logs from the old single-JSON-array format if needed
+        self._migrate_legacy_logs(legacy_file)
+        
         # Initialize log file if it doesn't exist
         if not Path(log_file).exists():
-            self._save_logs([])
+            Path(log_file).touch()
+        
+        # Logs are kept in memory; all mutation happens under _lock and
+        # readers iterate a snapshot outside it. New entries are queued,
+        # serialized and appended to the file by a background consumer thread.
+        # Queue items are (generation, entry); clear_logs bumps the
+        # generation so entries queued before a clear are never written.
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._generation = 0
+        self._unwritten: List[Dict] = []
+        self._logs = self._load_logs()
+        
+        # Statistics are maintained incrementally as entries are added
+        self._stats = self._compute_stats(self._logs)
+        
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop,
+            name="distribution-log-flush",
+            daemon=True
+        )
+        self._fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._flush_thread.start()
+        atexit.register(self.close)
+    
+    def _migrate_legacy_logs(self, legacy_file: str = None):
+        """
+        Rewrite logs stored as a single JSON array as JSON Lines
+        
+        Handles both the old default distribution_log.json next to the new
+        file and a log file that itself still contains a JSON array.
+        
+        Args:
+            legacy_file: Path of the old default log file, if any
+        """
+        if legacy_file and os.path.exists(legacy_file) and not os.path.exists(self.log_file):
+            source = legacy_file
+        elif os.path.exists(self.log_file):
+            with open(self.log_file, 'r') as f:
+                if f.read(64).lstrip()[:1] != '[':
+                    return
+            source = self.log_file
+        else:
+            return
+        
+        try:
+            with open(source, 'rb') as f:
+                logs = orjson.loads(f.read())
+            with open(self.log_file, 'wb') as f:
+                f.writelines(orjson.dumps(entry, default=str, option=orjson.OPT_APPEND_NEWLINE) for entry in logs)
+            if source != self.log_file:
+                os.replace(source, source + '.bak')
+            logger.info(f"Migrated {len(logs)} log entries from {source} to JSON Lines")
+        except Exception as e:
+            logger.error(f"Failed to migrate legacy logs from {source}: {e}")
     
     def _load_logs(self) -> List[Dict]:
         """
-        Load logs from file
+        Load logs from file, one JSON entry per line
         
         Returns:
             List of log entries
         """
+        logs = []
         try:
-            with open(self.log_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            with open(self.log_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        logs.append(self._promote_timestamp(orjson.loads(line)))
+                    except orjson.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed log line: {e}")
+        except FileNotFoundError as e:
             logger.error(f"Failed to load logs: {e}")
-            return []
+        
+        # Batches can land slightly out of order; keep memory chronological
+        logs.sort(key=lambda entry: entry["ts"])
+        return logs
     
-    def _save_logs(self, logs: List[Dict]):
+    @staticmethod
+    def _promote_timestamp(log_entry: Dict) -> Dict:
         """
-        Save logs to file
+        Convert a legacy ISO "timestamp" field to integer epoch microseconds
         
         Args:
-            logs: List of log entries
+            log_entry: Log entry as loaded from file
+            
+        Returns:
+            The same entry, with "ts" set
+        """
+        if "ts" not in log_entry:
+            timestamp = log_entry.pop("timestamp", None)
+            try:
+                log_entry["ts"] = round(datetime.fromisoformat(timestamp).timestamp() * 1_000_000)
+            except (TypeError, ValueError):
+                log_entry["ts"] = 0
+        return log_entry
+    
+    @staticmethod
+    def _format_entry(log_entry: Dict) -> Dict:
         """
+        Return a copy of an entry with its ISO "timestamp" field for display
+        
+        Args:
+            log_entry: Log entry with "ts" in epoch microseconds
+            
+        Returns:
+            Shallow copy of the entry including "timestamp"
+        """
+        formatted = dict(log_entry)
+        formatted["timestamp"] = _iso_timestamp(log_entry.get("ts", 0))
+        return formatted
+    
+    def _append_lines(self, entries: List[Dict]):
+        """
+        Append entries to the log file, one JSON line each
+        
+        Args:
+            entries: Log entries to append
+        """
+        lines = [
+            orjson.dumps(entry, default=str, option=orjson.OPT_APPEND_NEWLINE)
+            for entry in entries
+        ]
         try:
-            with open(self.log_file, 'w') as f:
-                json.dump(logs, f, indent=2, default=str)
+            # One vectored write per batch on the already-open descriptor
+            while lines:
+                written = os.writev(self._fd, lines[:_IOV_MAX])
+                # Drop fully written lines and trim a partially written one
+                done = 0
+                while done < len(lines) and written >= len(lines[done]):
+                    written -= len(lines[done])
+                    done += 1
+                del lines[:done]
+                if written:
+                    lines[0] = lines[0][written:]
         except Exception as e:
             logger.error(f"Failed to save logs: {e}")
             raise
     
+    def _flush_loop(self):
+        """Background consumer writing queued entries in batches"""
+        while True:
+            batch = [self._queue.get()]
+            
+            # Give a burst of events a moment to batch up; a flush() marker
+            # ends the batch early
+            deadline = time.monotonic() + self.FLUSH_DELAY
+            while len(batch) < self.FLUSH_BATCH_SIZE and not isinstance(batch[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            waiter = batch.pop() if isinstance(batch[-1], threading.Event) else None
+            try:
+                self._write_batch(batch)
+            except Exception:
+                # Already logged by _append_lines; entries are retried next batch
+                pass
+            finally:
+                if waiter:
+                    waiter.set()
+    
+    def _write_batch(self, batch: List[tuple]):
+        """
+        Write a batch of queued entries, skipping any queued before a clear
+        
+        Args:
+            batch: List of (generation, entry) queue items
+        """
+        with self._flush_lock:
+            entries = self._unwritten + [entry for generation, entry in batch if generation == self._generation]
+            self._unwritten = []
+            if not entries or self._fd is None:
+                return
+            try:
+                self._append_lines(entries)
+            except Exception:
+                # Keep the entries so the next write retries them
+                self._unwritten = entries
+                raise
+    
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        """Return zeroed statistics counters"""
+        return {
+            "total_syncs": 0,
+            "total_distributions": 0,
+            "successful_distributions": 0,
+            "failed_distributions": 0
+        }
+    
+    @staticmethod
+    def _compute_stats(logs: List[Dict]) -> Dict[str, int]:
+        """
+        Compute statistics counters for a list of entries in one pass
+        
+        Args:
+            logs: Log entries to count
+            
+        Returns:
+            Dictionary with statistics
+        """
+        # Bulk entries have no "status", so count on .get() rather than itemgetter
+        counts = Counter((log.get("event_type"), log.get("status")) for log in logs)
+        by_type = Counter()
+        for (event_type, _), count in counts.items():
+            by_type[event_type] += count
+        
+        return {
+            "total_syncs": by_type["certificate_sync"],
+            "total_distributions": by_type["certificate_distribution"] + by_type["bulk_distribution"],
+            "successful_distributions": counts[("certificate_distribution", "success")],
+            "failed_distributions": counts[("certificate_distribution", "error")]
+        }
+    
+    def _count_event(self, log_entry: Dict):
+        """
+        Update the statistics counters for one log entry
+        
+        Args:
+            log_entry: Log entry being added
+        """
+        stats = self._stats
+        event_type = log_entry.get("event_type")
+        if event_type == "certificate_sync":
+            stats["total_syncs"] += 1
+        elif event_type == "certificate_distribution":
+            stats["total_distributions"] += 1
+            status = log_entry.get("status")
+            if status == "success":
+                stats["successful_distributions"] += 1
+            elif status == "error":
+                stats["failed_distributions"] += 1
+        elif event_type == "bulk_distribution":
+            stats["total_distributions"] += 1
+    
+    def _append(self, log_entry: Dict):
+        """
+        Append an entry to the in-memory log and schedule a write
+        
+        Args:
+            log_entry: Log entry to append
+        """
+        with self._lock:
+            self._logs.append(log_entry)
+            self._count_event(log_entry)
+            self._queue.put((self._generation, log_entry))
+    
+    def flush(self):
+        """Write all queued log entries to file now"""
+        # Let the consumer write everything queued ahead of a marker, so
+        # batches it already holds are included
+        if self._flush_thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            if done.wait(timeout=5):
+                return
+        
+        # Consumer unavailable; drain the queue directly
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(item, threading.Event):
+                batch.append(item)
+        self._write_batch(batch)
+    
+    def close(self):
+        """Write queued entries and close the log file"""
+        try:
+            self.flush()
+        finally:
+            with self._flush_lock:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+    
     def add_sync_event(self, domains: List[str], status: str, results: List[Dict] = None):
         """
         Add a certificate sync event to the log
@@ -73,18 +376,15 @@ class DistributionLog:
             status: Status of the sync (success, error, partial)
             results: List of sync results per domain
         """
-        logs = self._load_logs()
-        
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "ts": time.time_ns() // 1000,
             "event_type": "certificate_sync",
             "status": status,
             "domains": domains,
             "results": results or []
         }
         
-        logs.append(log_entry)
-        self._save_logs(logs)
+        self._append(log_entry)
         logger.info(f"Logged certificate sync event: {status}")
     
     def add_distribution_event(self, domain: str, host: str, status: str, 
@@ -99,10 +399,8 @@ class DistributionLog:
             files: List of files distributed
             error: Error message if status is error
         """
-        logs = self._load_logs()
-        
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "ts": time.time_ns() // 1000,
             "event_type": "certificate_distribution",
             "domain": domain,
             "host": host,
@@ -111,8 +409,7 @@ class DistributionLog:
             "error": error
         }
         
-        logs.append(log_entry)
-        self._save_logs(logs)
+        self._append(log_entry)
         logger.info(f"Logged distribution event for {host}: {status}")
     
     def add_bulk_distribution_event(self, results: List[Dict]):
@@ -122,10 +419,8 @@ class DistributionLog:
         Args:
             results: List of distribution results for multiple hosts
         """
-        logs = self._load_logs()
-        
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "ts": time.time_ns() // 1000,
             "event_type": "bulk_distribution",
             "results": results,
             "total_hosts": len(results),
@@ -133,10 +428,49 @@ class DistributionLog:
             "failed": len([r for r in results if r.get("status") == "error"])
         }
         
-        logs.append(log_entry)
-        self._save_logs(logs)
+        self._append(log_entry)
         logger.info(f"Logged bulk distribution: {log_entry['successful']} succeeded, {log_entry['failed']} failed")
     
+    def _iter_logs(self, event_type: str = None, newest_first: bool = False) -> Iterator[Dict]:
+        """
+        Iterate over log entries without building filtered copies
+        
+        Args:
+            event_type: Only yield entries of this event type
+            newest_first: Yield the most recently added entries first
+            
+        Yields:
+            Log entries in the order they were added (or reverse order)
+        """
+        # The list is only ever appended to (clear_logs replaces it), so the
+        # list and its current length taken under the lock form a stable
+        # snapshot that can be read without holding the lock or copying
+        with self._lock:
+            logs = self._logs
+            count = len(logs)
+        
+        indices = range(count - 1, -1, -1) if newest_first else range(count)
+        for i in indices:
+            log = logs[i]
+            if not event_type or log.get("event_type") == event_type:
+                yield log
+    
+    def iter_recent_logs(self, limit: int = 100, event_type: str = None) -> Iterator[Dict]:
+        """
+        Iterate over the most recent logs with optional filtering
+        
+        Args:
+            limit: Maximum number of logs to yield
+            event_type: Filter by event type (certificate_sync, certificate_distribution, bulk_distribution)
+            
+        Yields:
+            Log entries (most recent first), each with an ISO "timestamp"
+        """
+        # Entries are appended in time order, so walk from the newest end
+        # and stop once enough have been collected
+        for log in itertools.islice(self._iter_logs(event_type, newest_first=True), max(0, limit)):
+            yield self._format_entry(log)
+    
     def get_logs(self, limit: int = 100, event_type: str = None) -> List[Dict]:
         """
         Get logs with optional filtering
@@ -146,21 +480,21 @@ class DistributionLog:
             event_type: Filter by event type (certificate_sync, certificate_distribution, bulk_distribution)
             
         Returns:
-            List of log entries (most recent first)
+            List of log entries (most recent first), each with an ISO "timestamp"
         """
-        logs = self._load_logs()
-        
-        # Filter by event type if specified
-        if event_type:
-            logs = [log for log in logs if log.get("event_type") == event_type]
-        
-        # Sort by timestamp (most recent first) and limit
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        return logs[:limit]
+        return list(self.iter_recent_logs(limit, event_type))
     
     def clear_logs(self):
         """Clear all logs"""
-        self._save_logs([])
+        with self._flush_lock:
+            with self._lock:
+                self._logs = []
+                self._stats = self._empty_stats()
+                self._generation += 1
+            self._unwritten = []
+            # Truncate the file; appends continue from the new end
+            if self._fd is not None:
+                os.ftruncate(self._fd, 0)
         logger.info("Cleared all distribution logs")
     
     def get_stats(self) -> Dict:
@@ -170,24 +504,5 @@ class DistributionLog:
         Returns:
             Dictionary with statistics
         """
-        logs = self._load_logs()
-        
-        total_syncs = len([log for log in logs if log.get("event_type") == "certificate_sync"])
-        total_distributions = len([log for log in logs if log.get("event_type") in ["certificate_distribution", "bulk_distribution"]])
-        
-        successful_distributions = len([
-            log for log in logs 
-            if log.get("event_type") == "certificate_distribution" and log.get("status") == "success"
-        ])
-        
-        failed_distributions = len([
-            log for log in logs 
-            if log.get("event_type") == "certificate_distribution" and log.get("status") == "error"
-        ])
-        
-        return {
-            "total_syncs": total_syncs,
-            "total_distributions": total_distributions,
-            "successful_distributions": successful_distributions,
-            "failed_distributions": failed_distributions
-        }
+        with self._lock:
+            return dict(self._stats)
@@ -2,25 +2,57 @@
 Main Flask application for Porkbun Certificate Sync
 """
 import os
+import re
+import queue
+import secrets
+import threading
+import atexit
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional
+import orjson
+from flask import Flask, Response, render_template, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from .config import Config
 from .sync import CertificateSync
-from .porkbun_api import PorkbunAPI
+from .password_encryption import get_password_encryption
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# Hand log records to a background listener so request threads don't
+# format and write them while holding the handler locks
+_log_queue = queue.Queue(-1)
+_root_logger = logging.getLogger()
+_log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(_log_queue)]
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes request and response bodies with orjson"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize an object to a JSON string"""
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes"""
+        return orjson.loads(s)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 # Generate a random secret key if not provided in production
 secret_key = os.environ.get('SECRET_KEY')
 if not secret_key:
-    import secrets
     secret_key = secrets.token_hex(32)
     logger.warning("No SECRET_KEY environment variable set. Using randomly generated key. Sessions will not persist across restarts.")
 app.secret_key = secret_key
@@ -29,11 +61,80 @@ app.secret_key = secret_key
 config = Config()
 cert_sync = CertificateSync(config)
 
+# Load the encryption key and build the ciphers before the first request needs them
+get_password_encryption()
+
 # Start scheduler if configured
 try:
     cert_sync.start_scheduler()
 except Exception as e:
-    logger.error(f"Failed to start scheduler: {e}")
+    logger.error("Failed to start scheduler: %s", e)
+
+
+# Serialized response bodies keyed by name: (config.version, body)
+_response_cache: Dict[str, tuple] = {}
+_response_cache_lock = threading.Lock()
+
+
+def _cached_response(key: str, build: Callable[[], object]) -> Response:
+    """
+    Return a JSON response, rebuilding and reserializing the payload only
+    when the config has changed
+    
+    Args:
+        key: Cache key for the payload
+        build: Function that builds the payload from the current config
+        
+    Returns:
+        JSON response with the cached or freshly serialized body
+    """
+    version = config.version
+    cached = _response_cache.get(key)
+    if cached and cached[0] == version:
+        body = cached[1]
+    else:
+        body = orjson.dumps(build())
+        with _response_cache_lock:
+            _response_cache[key] = (version, body)
+    return Response(body, mimetype='application/json')
+
+
+def _build_settings() -> Dict:
+    """Build the /api/settings payload"""
+    api_key, secret_key = config.get_api_credentials()
+    return {
+        "api": {
+            "api_key": api_key,
+            "secret_key": "***" if secret_key else "",
+            "has_secret": bool(secret_key)
+        },
+        "certificates": config.get_certificate_config(),
+        "schedule": config.get_schedule_config()
+    }
+
+
+def _build_safe_hosts() -> list:
+    """Build the SSH host list with password fields removed"""
+    safe_hosts = []
+    for host in cert_sync.ssh_config.get_ssh_hosts():
+        safe_host = host.copy()
+        safe_host.pop('password_hash', None)
+        safe_host.pop('password_encrypted', None)
+        safe_host['has_password'] = bool(host.get('password_encrypted') or host.get('password_hash'))
+        safe_hosts.append(safe_host)
+    return safe_hosts
+
+
+# Maximum length for error messages to prevent exposure
+MAX_ERROR_LENGTH = 200
+
+# File paths and tracebacks are never returned to the client
+_UNSAFE_ERROR = re.compile(r'[/\\]|Traceback').search
+_INTERNAL_ERROR_MESSAGE = "An internal error occurred"
+_EMPTY_ERROR_MESSAGE = "An error occurred"
+
+# Hostname-style domain: dot-separated labels of up to 63 characters, 253 total
+_DOMAIN_RE = re.compile(r'^(?=.{1,253}$)(?!-)[A-Za-z0-9-]{1,63}(?<!-)(\.[A-Za-z0-9-]{1,63}(?<!-))+$')
 
 
 def sanitize_error_message(error: Exception) -> str:
@@ -46,72 +147,96 @@ def sanitize_error_message(error: Exception) -> str:
     Returns:
         A safe error message string
     """
-    # Maximum length for error messages to prevent exposure
-    MAX_ERROR_LENGTH = 200
-    
-    # Only return safe, generic messages in production
     error_str = str(error)
+    if not error_str:
+        return _EMPTY_ERROR_MESSAGE
     
-    # Don't expose file paths, stack traces, or internal details
-    if '/' in error_str or '\\' in error_str or 'Traceback' in error_str:
-        return "An internal error occurred"
+    # Don't expose long messages, file paths, stack traces, or internal details
+    if len(error_str) > MAX_ERROR_LENGTH or _UNSAFE_ERROR(error_str):
+        return _INTERNAL_ERROR_MESSAGE
     
     # Return the error message if it's safe
-    return error_str if error_str else "An error occurred"
+    return error_str
+
+
+# Rendered home page keyed by script root; the template only varies by
+# the static URLs it builds
+_index_html: Dict[str, bytes] = {}
 
 
 @app.route('/')
 def index():
     """Home page"""
-    return render_template('index.html')
+    if app.debug:
+        return render_template('index.html')
+    
+    html = _index_html.get(request.script_root)
+    if html is None:
+        html = _index_html[request.script_root] = render_template('index.html').encode()
+    return Response(html, mimetype='text/html')
 
 
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
     """Get current settings"""
     try:
-        api_key, secret_key = config.get_api_credentials()
-        cert_config = config.get_certificate_config()
-        schedule_config = config.get_schedule_config()
-        
-        return jsonify({
-            "api": {
-                "api_key": api_key,
-                "secret_key": "***" if secret_key else "",
-                "has_secret": bool(secret_key)
-            },
-            "certificates": cert_config,
-            "schedule": schedule_config
-        })
+        return _cached_response("settings", _build_settings)
     except Exception as e:
-        logger.error(f"Failed to get settings: {e}")
+        logger.error("Failed to get settings: %s", e)
         return jsonify({"error": "Failed to load settings"}), 500
 
 
+# Porkbun API keys and secret keys carry these prefixes
+_API_KEY_PREFIX = 'pk1_'
+_SECRET_KEY_PREFIX = 'sk1_'
+
+
 @app.route('/api/settings/api', methods=['POST'])
 def update_api_settings():
-    """Update API credentials"""
+    """Update API credentials (checked against Porkbun by /api/settings/api/test)"""
     try:
         data = request.json
-        api_key = data.get('api_key', '')
-        secret_key = data.get('secret_key', '')
+        api_key = data.get('api_key', '').strip()
+        secret_key = data.get('secret_key', '').strip()
         
         if not api_key or not secret_key:
             return jsonify({"error": "API key and secret key are required"}), 400
         
-        # Test credentials
-        api = PorkbunAPI(api_key, secret_key)
-        if not api.ping():
-            return jsonify({"error": "Invalid API credentials"}), 400
+        if not api_key.startswith(_API_KEY_PREFIX) or not secret_key.startswith(_SECRET_KEY_PREFIX):
+            return jsonify({"error": f"API key must start with {_API_KEY_PREFIX} and secret key with {_SECRET_KEY_PREFIX}"}), 400
         
         config.set_api_credentials(api_key, secret_key)
         
         return jsonify({"status": "success", "message": "API credentials updated"})
     except Exception as e:
-        logger.error(f"Failed to update API settings: {e}")
+        logger.error("Failed to update API settings: %s", e)
         return jsonify({"error": "Failed to update API settings"}), 500
 
 
+@app.route('/api/settings/api/test', methods=['POST'])
+def test_api_settings():
+    """Test API credentials against Porkbun (the given ones, or the stored ones)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        api_key = data.get('api_key', '').strip()
+        secret_key = data.get('secret_key', '').strip()
+        if not api_key or not secret_key:
+            api_key, secret_key = config.get_api_credentials()
+        
+        if not api_key or not secret_key:
+            return jsonify({"error": "API key and secret key are required"}), 400
+        
+        # Share the sync client's warm connections without touching its credentials
+        valid = cert_sync.api.with_credentials(api_key, secret_key).ping()
+        if not valid:
+            return jsonify({"error": "Invalid API credentials"}), 400
+        
+        return jsonify({"status": "success", "message": "API credentials are valid"})
+    except Exception as e:
+        logger.error("Failed to test API settings: %s", e)
+        return jsonify({"error": "Failed to test API settings"}), 500
+
+
 @app.route('/api/settings/certificates', methods=['POST'])
 def update_certificate_settings():
     """Update certificate settings"""
@@ -130,7 +255,7 @@ def update_certificate_settings():
         
         return jsonify({"status": "success", "message": "Certificate settings updated"})
     except Exception as e:
-        logger.error(f"Failed to update certificate settings: {e}")
+        logger.error("Failed to update certificate settings: %s", e)
         return jsonify({"error": "Failed to update certificate settings"}), 500
 
 
@@ -152,7 +277,7 @@ def update_schedule_settings():
         
         return jsonify({"status": "success", "message": "Schedule settings updated"})
     except Exception as e:
-        logger.error(f"Failed to update schedule settings: {e}")
+        logger.error("Failed to update schedule settings: %s", e)
         return jsonify({"error": "Failed to update schedule settings"}), 500
 
 
@@ -160,10 +285,9 @@ def update_schedule_settings():
 def get_domains():
     """Get list of domains"""
     try:
-        domains = config.get_domains()
-        return jsonify({"domains": domains})
+        return _cached_response("domains", lambda: {"domains": config.get_domains()})
     except Exception as e:
-        logger.error(f"Failed to get domains: {e}")
+        logger.error("Failed to get domains: %s", e)
         return jsonify({"error": "Failed to load domains"}), 500
 
 
@@ -179,24 +303,77 @@ def add_domain():
         
         if not domain:
             return jsonify({"error": "Domain is required"}), 400
+        if not _DOMAIN_RE.match(domain):
+            return jsonify({"error": "Invalid domain"}), 400
         
         config.add_domain(domain, custom_name or None, separator, alt_file_names)
         
         return jsonify({"status": "success", "message": f"Domain {domain} added"})
     except ValueError as e:
         # ValueError messages are safe to return as they come from our own code
-        # Maximum length for error messages to prevent exposure
-        MAX_ERROR_LENGTH = 200
         error_msg = str(e)
         # Only return simple error messages, no stack traces
         if not error_msg or len(error_msg) > MAX_ERROR_LENGTH:
             error_msg = "Invalid domain configuration"
         return jsonify({"error": error_msg}), 400
     except Exception as e:
-        logger.error(f"Failed to add domain: {e}")
+        logger.error("Failed to add domain: %s", e)
         return jsonify({"error": "Failed to add domain"}), 500
 
 
+@app.route('/api/domains/batch', methods=['POST'])
+def batch_update_domains():
+    """Add and remove several domains with a single config write"""
+    try:
+        data = request.json or {}
+        to_add = data.get('add', [])
+        to_remove = data.get('remove', [])
+        
+        if not isinstance(to_add, list) or not isinstance(to_remove, list):
+            return jsonify({"error": "add and remove must be lists"}), 400
+        
+        # Entries are either a bare domain name or a domain object
+        to_add = [entry if isinstance(entry, dict) else {"domain": entry} for entry in to_add]
+        for entry in to_add:
+            alt_file_names = entry.get('alt_file_names') or []
+            if not isinstance(alt_file_names, list) or not all(isinstance(n, str) for n in alt_file_names):
+                return jsonify({"error": "alt_file_names must be a list of strings"}), 400
+        
+        added = []
+        removed = []
+        errors = []
+        
+        # Every change inside the block is saved once on exit
+        with config:
+            for domain in to_remove:
+                domain = str(domain).strip()
+                if config.remove_domain(domain):
+                    removed.append(domain)
+                else:
+                    errors.append({"domain": domain, "error": "Domain not found"})
+            
+            for entry in to_add:
+                domain = str(entry.get('domain') or '').strip()
+                if not _DOMAIN_RE.match(domain):
+                    errors.append({"domain": domain, "error": "Invalid domain"})
+                    continue
+                try:
+                    config.add_domain(
+                        domain,
+                        str(entry.get('custom_name') or '').strip() or None,
+                        entry.get('separator') or '_',
+                        entry.get('alt_file_names') or []
+                    )
+                    added.append(domain)
+                except ValueError as e:
+                    errors.append({"domain": domain, "error": str(e)[:MAX_ERROR_LENGTH] or "Invalid domain configuration"})
+        
+        return jsonify({"status": "success", "added": added, "removed": removed, "errors": errors})
+    except Exception as e:
+        logger.error("Failed to update domains: %s", e)
+        return jsonify({"error": "Failed to update domains"}), 500
+
+
 @app.route('/api/domains/<domain>', methods=['PUT'])
 def update_domain(domain):
     """Update an existing domain"""
@@ -209,19 +386,20 @@ def update_domain(domain):
         
         if not new_domain:
             return jsonify({"error": "Domain is required"}), 400
+        if not _DOMAIN_RE.match(new_domain):
+            return jsonify({"error": "Invalid domain"}), 400
         
         config.update_domain(domain, new_domain, custom_name or None, separator, alt_file_names)
         
         return jsonify({"status": "success", "message": f"Domain {new_domain} updated"})
     except ValueError as e:
         # ValueError messages are safe to return as they come from our own code
-        MAX_ERROR_LENGTH = 200
         error_msg = str(e)
         if not error_msg or len(error_msg) > MAX_ERROR_LENGTH:
             error_msg = "Invalid domain configuration"
         return jsonify({"error": error_msg}), 400
     except Exception as e:
-        logger.error(f"Failed to update domain: {e}")
+        logger.error("Failed to update domain: %s", e)
         return jsonify({"error": "Failed to update domain"}), 500
 
 
@@ -232,22 +410,42 @@ def remove_domain(domain):
         config.remove_domain(domain)
         return jsonify({"status": "success", "message": f"Domain {domain} removed"})
     except Exception as e:
-        logger.error(f"Failed to remove domain: {e}")
+        logger.error("Failed to remove domain: %s", e)
         return jsonify({"error": "Failed to remove domain"}), 500
 
 
+# Manual syncs run in the background; only one may be in flight at a time
+_sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sync')
+_active_sync: Optional[Future] = None
+_active_sync_lock = threading.Lock()
+
+
+def _run_sync() -> Dict:
+    """Run a full sync, logging any error it reports"""
+    try:
+        # Manual syncs always fetch, even certificates not due for renewal
+        result = cert_sync.sync_all(force=True)
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    if result.get("status") == "error" and "error" in result:
+        logger.error("Sync error: %s", result.get('error'))
+    elif result.get("status") == "skipped":
+        logger.info("Manual sync skipped: %s", result.get('reason'))
+    return result
+
+
 @app.route('/api/sync', methods=['POST'])
 def trigger_sync():
-    """Manually trigger certificate sync"""
+    """Manually trigger certificate sync in the background"""
+    global _active_sync
     try:
-        result = cert_sync.sync_all()
-        # Sanitize result to prevent error exposure
-        if result.get("status") == "error" and "error" in result:
-            logger.error(f"Sync error: {result.get('error')}")
-            return jsonify({"status": "error", "error": "Certificate sync failed"}), 500
-        return jsonify(result)
+        with _active_sync_lock:
+            if _active_sync is not None and not _active_sync.done():
+                return jsonify({"error": "A sync is already running"}), 409
+            _active_sync = _sync_executor.submit(_run_sync)
+        return jsonify({"status": "accepted", "message": "Sync started"}), 202
     except Exception as e:
-        logger.error(f"Sync failed: {e}")
+        logger.error("Sync failed: %s", e)
         return jsonify({"error": "Certificate sync failed"}), 500
 
 
@@ -255,35 +453,44 @@ def trigger_sync():
 def get_sync_status():
     """Get sync status"""
     try:
-        status = cert_sync.get_status()
+        status = dict(cert_sync.get_status())
+        active = _active_sync
+        status["running"] = active is not None and not active.done()
+        if status["running"]:
+            # Covers the moment between submitting and sync_all starting
+            status["status"] = "running"
+        elif active is not None:
+            result = active.result()
+            if result.get("status") == "error":
+                # Sanitize result to prevent error exposure
+                status["sync_error"] = "Certificate sync failed"
+            elif result.get("status") == "skipped":
+                # Another sync (e.g. the scheduled one) was already running
+                status["sync_skipped"] = result.get("reason", "skipped")
         return jsonify(status)
     except Exception as e:
-        logger.error(f"Failed to get sync status: {e}")
+        logger.error("Failed to get sync status: %s", e)
         return jsonify({"error": "Failed to get sync status"}), 500
 
 
+# Health check body never changes, so it is serialized once
+_HEALTH_BODY = b'{"status":"healthy"}'
+
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy"}), 200
+    return Response(_HEALTH_BODY, status=200, mimetype='application/json')
 
 
 @app.route('/api/ssh-hosts', methods=['GET'])
 def get_ssh_hosts():
     """Get list of SSH hosts"""
     try:
-        hosts = cert_sync.ssh_config.get_ssh_hosts()
-        # Remove password fields from response
-        safe_hosts = []
-        for host in hosts:
-            safe_host = host.copy()
-            safe_host.pop('password_hash', None)
-            safe_host.pop('password_encrypted', None)
-            safe_host['has_password'] = bool(host.get('password_encrypted') or host.get('password_hash'))
-            safe_hosts.append(safe_host)
-        return jsonify({"hosts": safe_hosts})
+        # Password fields are removed from the cached projection
+        return _cached_response("ssh_hosts", lambda: {"hosts": _build_safe_hosts()})
     except Exception as e:
-        logger.error(f"Failed to get SSH hosts: {e}")
+        logger.error("Failed to get SSH hosts: %s", e)
         return jsonify({"error": "Failed to load SSH hosts"}), 500
 
 
@@ -325,7 +532,7 @@ def add_ssh_host():
             error_msg = "Invalid SSH host configuration"
         return jsonify({"error": error_msg}), 400
     except Exception as e:
-        logger.error(f"Failed to add SSH host: {e}")
+        logger.error("Failed to add SSH host: %s", e)
         return jsonify({"error": "Failed to add SSH host"}), 500
 
 
@@ -368,7 +575,7 @@ def update_ssh_host(display_name):
             error_msg = "Invalid SSH host configuration"
         return jsonify({"error": error_msg}), 400
     except Exception as e:
-        logger.error(f"Failed to update SSH host: {e}")
+        logger.error("Failed to update SSH host: %s", e)
         return jsonify({"error": "Failed to update SSH host"}), 500
 
 
@@ -379,7 +586,7 @@ def remove_ssh_host(display_name):
         cert_sync.ssh_config.remove_ssh_host(display_name)
         return jsonify({"status": "success", "message": f"SSH host {display_name} removed"})
     except Exception as e:
-        logger.error(f"Failed to remove SSH host: {e}")
+        logger.error("Failed to remove SSH host: %s", e)
         return jsonify({"error": "Failed to remove SSH host"}), 500
 
 
@@ -387,18 +594,25 @@ def remove_ssh_host(display_name):
 def get_distribution_logs():
     """Get distribution logs"""
     try:
-        limit = request.args.get('limit', 100, type=int)
+        # Clamped before streaming starts; errors after that would truncate the body
+        limit = max(0, request.args.get('limit', 100, type=int))
         event_type = request.args.get('event_type', None)
         
-        logs = cert_sync.distribution_log.get_logs(limit=limit, event_type=event_type)
-        stats = cert_sync.distribution_log.get_stats()
+        distribution_log = cert_sync.distribution_log
+        stats = distribution_log.get_stats()
+        
+        def generate():
+            # Emit entries as they are read so the full list is never built
+            yield b'{"stats":' + orjson.dumps(stats) + b',"logs":['
+            separator = b''
+            for log in distribution_log.iter_recent_logs(limit=limit, event_type=event_type):
+                yield separator + orjson.dumps(log)
+                separator = b','
+            yield b']}'
         
-        return jsonify({
-            "logs": logs,
-            "stats": stats
-        })
+        return Response(generate(), mimetype='application/json')
     except Exception as e:
-        logger.error(f"Failed to get distribution logs: {e}")
+        logger.error("Failed to get distribution logs: %s", e)
         return jsonify({"error": "Failed to get distribution logs"}), 500
 
 
@@ -428,30 +642,19 @@ def test_ssh_connection():
             if not test_password:
                 return jsonify({"error": "Password required"}), 400
         
-        # Test connection
-        import paramiko
-        ssh_client = paramiko.SSHClient()
-        # SECURITY NOTE: AutoAddPolicy automatically accepts unknown host keys
-        # This is used for ease of deployment but has security implications.
-        # In production, consider using SSH key-based authentication with known_hosts validation
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
+        # Always authenticate again: an open pooled client would still look
+        # healthy after the credentials changed on the host. The new client
+        # stays in the pool for the next distribution
         try:
-            ssh_client.connect(
-                hostname=host_config.get('hostname'),
-                port=host_config.get('port', 22),
-                username=host_config.get('username'),
-                password=test_password,
-                timeout=10
-            )
-            ssh_client.close()
+            cert_sync.ssh_pool.evict(display_name)
+            cert_sync.ssh_pool.get(display_name, host_config, test_password)
             return jsonify({"status": "success", "message": "Connection successful"})
         except Exception as e:
-            logger.error(f"SSH connection test failed: {e}")
+            logger.error("SSH connection test failed: %s", e)
             return jsonify({"status": "error", "error": "Connection test failed"}), 400
             
     except Exception as e:
-        logger.error(f"Failed to test SSH connection: {e}")
+        logger.error("Failed to test SSH connection: %s", e)
         return jsonify({"error": "Failed to test connection"}), 500
 
 
@@ -5,11 +5,22 @@ Uses symmetric encryption with a key derived from environment or generated
 import os
 import base64
 import logging
-from pathlib import Path
+import threading
+from typing import Optional
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 logger = logging.getLogger(__name__)
 
+# Size of the random AES-GCM nonce prepended to each ciphertext
+_NONCE_SIZE = 12
+
+# HKDF context separating the AES-GCM key from the stored (Fernet) key
+_AESGCM_KEY_INFO = b"ssh-password-aesgcm"
+
 
 class PasswordEncryption:
     """Handles password encryption and decryption"""
@@ -17,6 +28,16 @@ class PasswordEncryption:
     def __init__(self):
         """Initialize encryption with a key"""
         self._encryption_key = self._get_or_create_encryption_key()
+        # Passwords are encrypted with AES-256-GCM under a key derived from
+        # the stored one, so the same key bytes are never used by two ciphers;
+        # Fernet uses the stored key only to read values from older versions
+        aesgcm_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=_AESGCM_KEY_INFO
+        ).derive(base64.urlsafe_b64decode(self._encryption_key))
+        self._aesgcm = AESGCM(aesgcm_key)
         self._fernet = Fernet(self._encryption_key)
     
     def _get_or_create_encryption_key(self) -> bytes:
@@ -92,13 +113,14 @@ class PasswordEncryption:
             password: Plain text password
             
         Returns:
-            Encrypted password (base64 encoded)
+            Encrypted password (base64 encoded nonce and AES-GCM ciphertext)
         """
         if not password:
             return ""
         
-        encrypted = self._fernet.encrypt(password.encode())
-        return base64.urlsafe_b64encode(encrypted).decode()
+        nonce = os.urandom(_NONCE_SIZE)
+        encrypted = self._aesgcm.encrypt(nonce, password.encode(), None)
+        return base64.urlsafe_b64encode(nonce + encrypted).decode()
     
     def decrypt_password(self, encrypted_password: str) -> str:
         """
@@ -114,21 +136,62 @@ class PasswordEncryption:
             return ""
         
         try:
-            encrypted_bytes = base64.urlsafe_b64decode(encrypted_password.encode())
-            decrypted = self._fernet.decrypt(encrypted_bytes)
+            decrypted, _ = self._decrypt(encrypted_password)
             return decrypted.decode()
         except Exception as e:
             logger.error(f"Failed to decrypt password: {e}")
             raise ValueError("Failed to decrypt password - encryption key may have changed")
+    
+    def _decrypt(self, encrypted_password: str) -> tuple:
+        """
+        Decrypt a stored value in either the current or the legacy format
+        
+        Args:
+            encrypted_password: Encrypted password (base64 encoded)
+            
+        Returns:
+            Tuple of (plain text bytes, whether the value used the legacy format)
+        """
+        encrypted_bytes = base64.urlsafe_b64decode(encrypted_password.encode())
+        try:
+            return self._aesgcm.decrypt(encrypted_bytes[:_NONCE_SIZE], encrypted_bytes[_NONCE_SIZE:], None), False
+        except InvalidTag:
+            # Stored by an older version as a Fernet token (itself base64)
+            # wrapped in a second layer of base64
+            return self._fernet.decrypt(encrypted_bytes), True
+    
+    def upgrade_password(self, encrypted_password: str) -> Optional[str]:
+        """
+        Re-encrypt a value stored in the legacy double-base64 Fernet format
+        
+        Args:
+            encrypted_password: Encrypted password (base64 encoded)
+            
+        Returns:
+            The value in the current format, or None if it is already current
+            or cannot be decrypted
+        """
+        if not encrypted_password:
+            return None
+        
+        try:
+            decrypted, legacy = self._decrypt(encrypted_password)
+        except Exception:
+            return None
+        return self.encrypt_password(decrypted.decode()) if legacy else None
 
 
-# Global instance
+# Global instance, created once per process
 _password_encryption = None
+_password_encryption_lock = threading.Lock()
 
 
 def get_password_encryption() -> PasswordEncryption:
     """Get the global password encryption instance"""
     global _password_encryption
     if _password_encryption is None:
-        _password_encryption = PasswordEncryption()
+        # Concurrent first calls must not each load or generate a key
+        with _password_encryption_lock:
+            if _password_encryption is None:
+                _password_encryption = PasswordEncryption()
     return _password_encryption
@@ -1,28 +1,86 @@
 """
 Porkbun API Client for certificate retrieval
 """
+import time
+import hashlib
+import orjson
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Pooled connections kept open, enough for the sync's concurrent retrievals
+_MAX_POOLED_CONNECTIONS = 8
+
+# Seconds a ping result is reused for the same credentials
+PING_CACHE_TTL = 30
+# Seconds a successful ping is reused, so back-to-back syncs skip the round trip
+PING_SUCCESS_CACHE_TTL = 300
+_PING_CACHE_MAX_ENTRIES = 16
+
+# Ping results keyed by a digest of the credentials: (time.monotonic(), valid)
+_ping_cache: Dict[bytes, Tuple[float, bool]] = {}
+
 
 class PorkbunAPI:
     """Client for interacting with Porkbun API"""
     
     BASE_URL = "https://api.porkbun.com/api/json/v3"
     
-    def __init__(self, api_key: str, secret_key: str):
+    def __init__(self, api_key: str, secret_key: str, session: Optional[requests.Session] = None):
         """
         Initialize Porkbun API client
         
         Args:
             api_key: Porkbun API key
             secret_key: Porkbun secret key
+            session: Existing session to share connections with
         """
         self.api_key = api_key
         self.secret_key = secret_key
+        self._auth = {
+            "apikey": api_key,
+            "secretapikey": secret_key
+        }
+        # Identifies the credentials in the ping cache without storing them
+        self._credentials_digest = hashlib.blake2b(
+            f"{api_key}\0{secret_key}".encode(), digest_size=16
+        ).digest()
+        
+        if session is not None:
+            self._session = session
+            return
+        
+        # Persistent session so calls reuse pooled keep-alive connections.
+        # Every endpoint used here only reads, so POSTs are safe to retry.
+        self._session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=frozenset(["POST"])
+        )
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=_MAX_POOLED_CONNECTIONS,
+            max_retries=retry
+        ))
+    
+    def with_credentials(self, api_key: str, secret_key: str) -> 'PorkbunAPI':
+        """
+        Get a client for other credentials that shares this client's connections
+        
+        Args:
+            api_key: Porkbun API key
+            secret_key: Porkbun secret key
+            
+        Returns:
+            PorkbunAPI client using the same session
+        """
+        return PorkbunAPI(api_key, secret_key, session=self._session)
     
     def _make_request(self, endpoint: str, data: Optional[Dict] = None) -> Dict:
         """
@@ -36,36 +94,51 @@ class PorkbunAPI:
             API response as dictionary
         """
         url = f"{self.BASE_URL}/{endpoint}"
-        payload = {
-            "apikey": self.api_key,
-            "secretapikey": self.secret_key
-        }
-        if data:
-            payload.update(data)
+        # The auth payload is shared and only read, so it is sent as-is
+        # when there is nothing to add
+        payload = {**self._auth, **data} if data else self._auth
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self._session.post(url, json=payload, timeout=30)
             response.raise_for_status()
-            return response.json()
+            # Parse the raw body directly, skipping the decode to str
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"API returned invalid JSON: {e}")
+            raise
         except requests.exceptions.RequestException as e:
             logger.error(f"API request failed: {e}")
             raise
     
     def ping(self) -> bool:
         """
-        Test API credentials
+        Test API credentials, reusing a recent result
+        
+        Valid credentials are trusted for PING_SUCCESS_CACHE_TTL seconds and
+        rejected ones for PING_CACHE_TTL seconds.
         
         Returns:
             True if credentials are valid
         """
+        cached = _ping_cache.get(self._credentials_digest)
+        if cached:
+            ttl = PING_SUCCESS_CACHE_TTL if cached[1] else PING_CACHE_TTL
+            if time.monotonic() - cached[0] < ttl:
+                return cached[1]
+        
         try:
             result = self._make_request("ping")
-            return result.get("status") == "SUCCESS"
+            valid = result.get("status") == "SUCCESS"
+            # Only answers from the API are cached, never connection failures
+            if len(_ping_cache) >= _PING_CACHE_MAX_ENTRIES:
+                _ping_cache.clear()
+            _ping_cache[self._credentials_digest] = (time.monotonic(), valid)
+            return valid
         except Exception as e:
             logger.error(f"Ping failed: {e}")
             return False
     
-    def retrieve_ssl_bundle(self, domain: str) -> Tuple[str, str, str]:
+    def retrieve_ssl_bundle(self, domain: str) -> Tuple[bytes, bytes, bytes]:
         """
         Retrieve SSL certificate bundle for a domain
         
@@ -73,7 +146,7 @@ class PorkbunAPI:
             domain: Domain name
             
         Returns:
-            Tuple of (certificate_chain, private_key, public_key)
+            Tuple of (certificate_chain, private_key, public_key) as PEM bytes
         """
         try:
             result = self._make_request(f"ssl/retrieve/{domain}")
@@ -81,9 +154,10 @@ class PorkbunAPI:
             if result.get("status") != "SUCCESS":
                 raise Exception(f"Failed to retrieve certificate: {result.get('message', 'Unknown error')}")
             
-            cert_chain = result.get("certificatechain", "")
-            private_key = result.get("privatekey", "")
-            public_key = result.get("publickey", "")
+            # Encode once here so downstream code can stay bytes-native
+            cert_chain = result.get("certificatechain", "").encode()
+            private_key = result.get("privatekey", "").encode()
+            public_key = result.get("publickey", "").encode()
             
             return cert_chain, private_key, public_key
             
@@ -1,8 +1,12 @@
 """
 SSH host configuration management
 """
+import hmac
+import time
 import logging
-from typing import Dict, List, Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 from .password_encryption import get_password_encryption
 
 logger = logging.getLogger(__name__)
@@ -11,6 +15,9 @@ logger = logging.getLogger(__name__)
 class SSHConfig:
     """Manages SSH host configuration"""
     
+    # Seconds a decrypted password is kept in memory for reuse
+    PASSWORD_CACHE_TTL = 60.0
+    
     def __init__(self, config):
         """
         Initialize SSH configuration manager
@@ -19,6 +26,63 @@ class SSHConfig:
             config: Main configuration manager instance
         """
         self.config = config
+        # (display_name, ciphertext) -> (time.monotonic(), plain text password)
+        self._password_cache: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        # Distribution threads fill the cache while request threads clear it
+        self._password_cache_lock = threading.Lock()
+        
+        # Lazily built display name -> list position index
+        self._host_index: Optional[Dict[str, int]] = None
+        self._host_index_list: Optional[List[Dict]] = None
+        
+        # Hosts sorted by display name, valid for one config version
+        self._sorted_hosts: Optional[List[Dict]] = None
+        self._sorted_hosts_key: Optional[Tuple[int, int]] = None
+        
+        self._upgrade_stored_passwords()
+    
+    def _upgrade_stored_passwords(self):
+        """Rewrite passwords stored in the legacy encryption format, saving once"""
+        hosts = self.config.config.get("ssh_hosts", [])
+        if not hosts:
+            return
+        
+        with self.batch():
+            for host in hosts:
+                upgraded = get_password_encryption().upgrade_password(host.get("password_encrypted"))
+                if upgraded:
+                    host["password_encrypted"] = upgraded
+                    self.config.save()
+                    logger.info(f"Upgraded stored password format for SSH host: {host.get('display_name')}")
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group several host changes into a single config write
+        
+        Saves made by add_ssh_host, update_ssh_host and remove_ssh_host inside
+        the block are deferred and written once on exit, e.g. for bulk imports:
+        
+            with ssh_config.batch():
+                for host in hosts:
+                    ssh_config.add_ssh_host(**host)
+        """
+        with self.config:
+            yield self
+    
+    def _get_host_index(self) -> Dict[str, int]:
+        """
+        Get a mapping of display name to its position in the hosts list
+        
+        The index is rebuilt lazily whenever the hosts list has been
+        replaced or resized outside of the host mutators.
+        """
+        hosts = self.config.config.get("ssh_hosts", [])
+        if (self._host_index is None or self._host_index_list is not hosts
+                or len(self._host_index) != len(hosts)):
+            self._host_index = {h.get("display_name"): i for i, h in enumerate(hosts)}
+            self._host_index_list = hosts
+        return self._host_index
     
     def get_ssh_hosts(self) -> List[Dict]:
         """
@@ -26,10 +90,17 @@ class SSHConfig:
         
         Returns:
             List of SSH host configurations sorted by display name
+            (cached until the config changes; callers must not modify it)
         """
         hosts = self.config.config.get("ssh_hosts", [])
-        # Sort alphabetically by display_name
-        return sorted(hosts, key=lambda x: x.get("display_name", "").lower())
+        
+        # Every host change saves the config, which bumps its version
+        key = (self.config.version, id(hosts))
+        if self._sorted_hosts is None or self._sorted_hosts_key != key:
+            # Sort alphabetically by display_name
+            self._sorted_hosts = sorted(hosts, key=lambda x: x.get("display_name", "").casefold())
+            self._sorted_hosts_key = key
+        return self._sorted_hosts
     
     def add_ssh_host(self, display_name: str, hostname: str, port: int, 
                      username: str, password: str, cert_path: str, use_sudo: bool = False,
@@ -47,34 +118,36 @@ class SSHConfig:
             use_sudo: Whether to use sudo for file operations on remote host
             file_overrides: Optional dict to override specific file names for this host
         """
-        hosts = self.config.config.get("ssh_hosts", [])
-        
-        # Check if display name already exists
-        if any(h.get("display_name") == display_name for h in hosts):
-            raise ValueError(f"Display name '{display_name}' already exists")
-        
-        # Encrypt the password
-        password_enc = get_password_encryption()
-        encrypted_password = password_enc.encrypt_password(password)
-        
-        host_config = {
-            "display_name": display_name,
-            "hostname": hostname,
-            "port": port,
-            "username": username,
-            "password_encrypted": encrypted_password,
-            "cert_path": cert_path,
-            "use_sudo": use_sudo
-        }
-        
-        # Add file_overrides if provided
-        if file_overrides:
-            host_config["file_overrides"] = file_overrides
-        
-        hosts.append(host_config)
-        self.config.config["ssh_hosts"] = hosts
-        self.config.save()
-        logger.info(f"Added SSH host: {display_name}")
+        with self.batch():
+            hosts = self.config.config.setdefault("ssh_hosts", [])
+            index = self._get_host_index()
+            
+            # Check if display name already exists
+            if display_name in index:
+                raise ValueError(f"Display name '{display_name}' already exists")
+            
+            # Encrypt the password
+            encrypted_password = get_password_encryption().encrypt_password(password)
+            
+            host_config = {
+                "display_name": display_name,
+                "hostname": hostname,
+                "port": port,
+                "username": username,
+                "password_encrypted": encrypted_password,
+                "cert_path": cert_path,
+                "use_sudo": use_sudo
+            }
+            
+            # Add file_overrides if provided
+            if file_overrides:
+                host_config["file_overrides"] = file_overrides
+            
+            hosts.append(host_config)
+            index[display_name] = len(hosts) - 1
+            self._forget_password(display_name)
+            self.config.save()
+            logger.info(f"Added SSH host: {display_name}")
     
     def update_ssh_host(self, original_display_name: str, display_name: str, 
                        hostname: str, port: int, username: str, 
@@ -94,62 +167,62 @@ class SSHConfig:
             use_sudo: Whether to use sudo for file operations. If None, keeps existing setting
             file_overrides: Optional dict to override specific file names for this host
         """
-        hosts = self.config.config.get("ssh_hosts", [])
-        
-        # Find the host to update
-        host_index = None
-        for i, h in enumerate(hosts):
-            if h.get("display_name") == original_display_name:
-                host_index = i
-                break
-        
-        if host_index is None:
-            raise ValueError(f"SSH host '{original_display_name}' not found")
-        
-        # If display name is changing, check for duplicates
-        if original_display_name != display_name:
-            if any(h.get("display_name") == display_name for h in hosts):
-                raise ValueError(f"Display name '{display_name}' already exists")
-        
-        # Update the host configuration
-        host_config = {
-            "display_name": display_name,
-            "hostname": hostname,
-            "port": port,
-            "username": username,
-            "cert_path": cert_path
-        }
-        
-        # Keep existing password if no new password provided
-        if password:
-            password_enc = get_password_encryption()
-            host_config["password_encrypted"] = password_enc.encrypt_password(password)
-        else:
-            # Try to get encrypted password, fall back to old password_hash field
-            host_config["password_encrypted"] = hosts[host_index].get("password_encrypted", hosts[host_index].get("password_hash", ""))
-        
-        # Keep existing use_sudo setting if not provided
-        if use_sudo is not None:
-            host_config["use_sudo"] = use_sudo
-        else:
-            host_config["use_sudo"] = hosts[host_index].get("use_sudo", False)
-        
-        # Handle file_overrides
-        if file_overrides is not None:
-            # Explicit value provided: set if non-empty, remove if empty
-            if file_overrides:
-                host_config["file_overrides"] = file_overrides
-            # Empty dict means remove existing overrides (don't add to config)
-        else:
-            # No value provided (None): keep existing file_overrides
-            existing_overrides = hosts[host_index].get("file_overrides")
-            if existing_overrides:
-                host_config["file_overrides"] = existing_overrides
-        
-        hosts[host_index] = host_config
-        self.config.config["ssh_hosts"] = hosts
-        self.config.save()
-        logger.info(f"Updated SSH host: {display_name}")
+        with self.batch():
+            hosts = self.config.config.setdefault("ssh_hosts", [])
+            index = self._get_host_index()
+            
+            # Find the host to update
+            host_index = index.get(original_display_name)
+            
+            if host_index is None:
+                raise ValueError(f"SSH host '{original_display_name}' not found")
+            
+            # If display name is changing, check for duplicates
+            if original_display_name != display_name:
+                if display_name in index:
+                    raise ValueError(f"Display name '{display_name}' already exists")
+            
+            # Update the host configuration
+            host_config = {
+                "display_name": display_name,
+                "hostname": hostname,
+                "port": port,
+                "username": username,
+                "cert_path": cert_path
+            }
+            
+            # Keep existing password if no new password provided
+            if password:
+                host_config["password_encrypted"] = get_password_encryption().encrypt_password(password)
+            else:
+                # Try to get encrypted password, fall back to old password_hash field
+                host_config["password_encrypted"] = hosts[host_index].get("password_encrypted", hosts[host_index].get("password_hash", ""))
+            
+            # Keep existing use_sudo setting if not provided
+            if use_sudo is not None:
+                host_config["use_sudo"] = use_sudo
+            else:
+                host_config["use_sudo"] = hosts[host_index].get("use_sudo", False)
+            
+            # Handle file_overrides
+            if file_overrides is not None:
+                # Explicit value provided: set if non-empty, remove if empty
+                if file_overrides:
+                    host_config["file_overrides"] = file_overrides
+                # Empty dict means remove existing overrides (don't add to config)
+            else:
+                # No value provided (None): keep existing file_overrides
+                existing_overrides = hosts[host_index].get("file_overrides")
+                if existing_overrides:
+                    host_config["file_overrides"] = existing_overrides
+            
+            hosts[host_index] = host_config
+            del index[original_display_name]
+            index[display_name] = host_index
+            self._forget_password(original_display_name)
+            self._forget_password(display_name)
+            self.config.save()
+            logger.info(f"Updated SSH host: {display_name}")
     
     def remove_ssh_host(self, display_name: str):
         """
@@ -158,10 +231,16 @@ class SSHConfig:
         Args:
             display_name: Display name of the host to remove
         """
-        hosts = self.config.config.get("ssh_hosts", [])
-        self.config.config["ssh_hosts"] = [h for h in hosts if h.get("display_name") != display_name]
-        self.config.save()
-        logger.info(f"Removed SSH host: {display_name}")
+        with self.batch():
+            hosts = self.config.config.setdefault("ssh_hosts", [])
+            host_index = self._get_host_index().get(display_name)
+            if host_index is not None:
+                del hosts[host_index]
+                # Positions after the removed entry have shifted
+                self._host_index = None
+            self._forget_password(display_name)
+            self.config.save()
+            logger.info(f"Removed SSH host: {display_name}")
     
     def get_ssh_host(self, display_name: str) -> Optional[Dict]:
         """
@@ -173,11 +252,44 @@ class SSHConfig:
         Returns:
             Host configuration or None if not found
         """
-        hosts = self.get_ssh_hosts()
-        for host in hosts:
-            if host.get("display_name") == display_name:
-                return host
-        return None
+        host_index = self._get_host_index().get(display_name)
+        if host_index is None:
+            return None
+        return self.config.config["ssh_hosts"][host_index]
+    
+    def _decrypt_cached(self, display_name: str, encrypted_password: str) -> str:
+        """
+        Decrypt a stored password, reusing the result for PASSWORD_CACHE_TTL seconds
+        
+        Args:
+            display_name: Display name of the host
+            encrypted_password: Stored encrypted password
+            
+        Returns:
+            Plain text password
+        """
+        key = (display_name, encrypted_password)
+        now = time.monotonic()
+        with self._password_cache_lock:
+            cached = self._password_cache.get(key)
+        if cached and now - cached[0] < self.PASSWORD_CACHE_TTL:
+            return cached[1]
+        
+        decrypted = get_password_encryption().decrypt_password(encrypted_password)
+        with self._password_cache_lock:
+            self._password_cache[key] = (now, decrypted)
+        return decrypted
+    
+    def _forget_password(self, display_name: str):
+        """
+        Drop cached plain text passwords for a host
+        
+        Args:
+            display_name: Display name of the host
+        """
+        with self._password_cache_lock:
+            for key in [k for k in self._password_cache if k[0] == display_name]:
+                del self._password_cache[key]
     
     def verify_password(self, display_name: str, password: str) -> bool:
         """
@@ -199,9 +311,9 @@ class SSHConfig:
             return False
         
         try:
-            password_enc = get_password_encryption()
-            decrypted = password_enc.decrypt_password(encrypted_password)
-            return decrypted == password
+            decrypted = self._decrypt_cached(display_name, encrypted_password)
+            # Constant-time comparison so response timing doesn't reveal the password
+            return hmac.compare_digest(decrypted.encode(), password.encode())
         except Exception:
             return False
     
@@ -224,8 +336,7 @@ class SSHConfig:
             return None
         
         try:
-            password_enc = get_password_encryption()
-            return password_enc.decrypt_password(encrypted_password)
+            return self._decrypt_cached(display_name, encrypted_password)
         except Exception as e:
             logger.error(f"Failed to decrypt password for {display_name}: {e}")
             return None
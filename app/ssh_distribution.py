@@ -2,25 +2,229 @@
 SSH certificate distribution
 """
 import os
+import re
+import atexit
+import time
 import errno
+import shlex
+import secrets
+import posixpath
+import socket
+import hashlib
+import functools
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 import paramiko
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on hosts distributed to concurrently
+_MAX_DISTRIBUTION_WORKERS = 16
+
+# Upper bound on SFTP channels uploading to one host at once
+_MAX_SFTP_CHANNELS = 4
+
+
+def _open_socket(hostname: str, port: int, timeout: float) -> socket.socket:
+    """
+    Open a TCP connection tuned for SSH traffic
+    
+    Disables Nagle's algorithm so small SSH packets are not delayed. Buffer
+    sizes are left to the kernel, whose autotuning adapts them to the link.
+    
+    Args:
+        hostname: Remote host name or address
+        port: Remote SSH port
+        timeout: Connection timeout in seconds
+        
+    Returns:
+        Connected socket
+    """
+    sock = socket.create_connection((hostname, port), timeout=timeout)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError as e:
+        logger.debug("Could not set TCP_NODELAY for %s:%s: %s", hostname, port, e)
+    return sock
+
+
+class SSHConnectionPool:
+    """Keeps authenticated SSH clients open for reuse between requests"""
+    
+    # Seconds an unused client is kept open
+    IDLE_TIMEOUT = 300
+    # Maximum number of clients kept open at once
+    MAX_CLIENTS = 16
+    
+    def __init__(self):
+        """Initialize an empty connection pool"""
+        # display_name -> (connection params, client, last used)
+        self._clients: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        # display_name -> lock held while looking up or connecting that host,
+        # so concurrent misses make one connection instead of racing
+        self._host_locks: Dict[str, threading.Lock] = {}
+        atexit.register(self.close_all)
+    
+    @staticmethod
+    def _connection_params(host_config: Dict, password: str) -> tuple:
+        """
+        Build the key identifying a connection's target and credentials
+        
+        Args:
+            host_config: SSH host configuration
+            password: Plain text password for SSH connection
+            
+        Returns:
+            Tuple of hostname, port, username and a password fingerprint
+        """
+        return (
+            host_config.get("hostname"),
+            host_config.get("port", 22),
+            host_config.get("username"),
+            hashlib.sha256(password.encode()).digest()
+        )
+    
+    @staticmethod
+    def _is_alive(client: paramiko.SSHClient) -> bool:
+        """
+        Check that a pooled client's transport is still usable
+        
+        Args:
+            client: SSH client to check
+            
+        Returns:
+            True if the transport is active and accepts a keepalive
+        """
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+            return True
+        except (EOFError, OSError, paramiko.SSHException):
+            return False
+    
+    def get(self, display_name: str, host_config: Dict, password: str,
+            timeout: int = 10) -> paramiko.SSHClient:
+        """
+        Get an open SSH client for a host, connecting if needed
+        
+        Args:
+            display_name: Display name of the host
+            host_config: SSH host configuration
+            password: Plain text password for SSH connection
+            timeout: Connection timeout in seconds
+            
+        Returns:
+            Connected SSH client
+        """
+        params = self._connection_params(host_config, password)
+        now = time.monotonic()
+        stale = []
+        
+        with self._lock:
+            for name, (_, client, last_used) in list(self._clients.items()):
+                if now - last_used > self.IDLE_TIMEOUT:
+                    stale.append(self._clients.pop(name)[1])
+            host_lock = self._host_locks.setdefault(display_name, threading.Lock())
+        
+        for client in stale:
+            client.close()
+        
+        with host_lock:
+            with self._lock:
+                entry = self._clients.get(display_name)
+            
+            if entry:
+                cached_params, client, _ = entry
+                if cached_params == params and self._is_alive(client):
+                    with self._lock:
+                        self._clients[display_name] = (params, client, time.monotonic())
+                    return client
+                # The target or credentials changed, or the connection dropped
+                self.evict(display_name)
+            
+            client = paramiko.SSHClient()
+            # SECURITY NOTE: AutoAddPolicy automatically accepts unknown host keys
+            # This is used for ease of deployment but has security implications.
+            # In production, consider using SSH key-based authentication with known_hosts validation
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            try:
+                client.connect(
+                    hostname=params[0],
+                    port=params[1],
+                    username=params[2],
+                    password=password,
+                    timeout=timeout,
+                    sock=_open_socket(params[0], params[1], timeout)
+                )
+            except Exception:
+                client.close()
+                raise
+            
+            with self._lock:
+                self._clients[display_name] = (params, client, time.monotonic())
+                overflow = []
+                while len(self._clients) > self.MAX_CLIENTS:
+                    oldest = min(self._clients, key=lambda name: self._clients[name][2])
+                    overflow.append(self._clients.pop(oldest)[1])
+        
+        for old_client in overflow:
+            old_client.close()
+        return client
+    
+    def evict(self, display_name: str):
+        """
+        Close and forget the pooled client for a host
+        
+        Args:
+            display_name: Display name of the host
+        """
+        with self._lock:
+            entry = self._clients.pop(display_name, None)
+        if entry:
+            entry[1].close()
+    
+    def close_all(self):
+        """Close every pooled client"""
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for _, client, _ in entries:
+            client.close()
+
 
 class SSHDistributor:
     """Handles certificate distribution via SSH"""
     
-    def __init__(self, ssh_config):
+    # Certificate file suffixes that file_overrides can rename. The separator
+    # is required to avoid false matches, and the leftmost match wins so
+    # 'fullchain' is picked up before the 'chain' inside it
+    _OVERRIDE_SUFFIX_RE = re.compile(
+        r'[-_.](fullchain\.pem|private\.key|cert\.pem|chain\.pem)$',
+        re.IGNORECASE
+    )
+    _OVERRIDE_KEYS = {
+        'fullchain.pem': 'fullchain',
+        'private.key': 'privkey',
+        'cert.pem': 'cert',
+        'chain.pem': 'chain',
+    }
+    
+    def __init__(self, ssh_config, ssh_pool: Optional[SSHConnectionPool] = None):
         """
         Initialize SSH distributor
         
         Args:
             ssh_config: SSH configuration manager instance
+            ssh_pool: Connection pool to share; a private one is created if omitted
         """
         self.ssh_config = ssh_config
+        self.ssh_pool = ssh_pool if ssh_pool is not None else SSHConnectionPool()
     
     def _is_permission_error(self, exception: Exception) -> bool:
         """
@@ -54,81 +258,129 @@ class SSHDistributor:
         Returns:
             The overridden file name, or the original if no override matches
         """
-        # Map file name patterns to override keys
-        # These patterns include the separator character to avoid false matches
-        # Check fullchain before chain since 'chain' would also match 'fullchain'
-        separators = ['_', '-', '.']
-        type_patterns = [
-            ('fullchain', [f'{sep}fullchain.pem' for sep in separators]),
-            ('privkey', [f'{sep}private.key' for sep in separators]),
-            ('cert', [f'{sep}cert.pem' for sep in separators]),
-            ('chain', [f'{sep}chain.pem' for sep in separators]),
-        ]
-        
-        filename_lower = filename.lower()
-        for override_key, patterns in type_patterns:
+        match = self._OVERRIDE_SUFFIX_RE.search(filename)
+        if match:
+            override_key = self._OVERRIDE_KEYS[match.group(1).lower()]
             if override_key in file_overrides:
-                for pattern in patterns:
-                    if filename_lower.endswith(pattern):
-                        logger.debug(f"Applying file override: {filename} -> {file_overrides[override_key]}")
-                        return file_overrides[override_key]
+                logger.debug("Applying file override: %s -> %s", filename, file_overrides[override_key])
+                return file_overrides[override_key]
         
         return filename
     
-    def distribute_to_host(self, host_config: Dict, certificate_files: List[str]) -> Dict:
+    def _sftp_upload(self, sftp: paramiko.SFTPClient, data: bytes,
+                     local_stat: os.stat_result, remote_file: str):
         """
-        Distribute certificates to a single host
+        Upload file contents over SFTP using pipelined writes
+        
+        Writes are sent without waiting for each acknowledgement; any
+        server error is raised when the remote file is closed.
         
         Args:
-            host_config: SSH host configuration
-            certificate_files: List of certificate file paths to distribute
+            sftp: Open SFTP client
+            data: Contents of the local file
+            local_stat: Stat result of the local file
+            remote_file: Destination path on the remote host (overwritten if it exists)
+        """
+        with sftp.open(remote_file, 'wb') as rf:
+            rf.set_pipelined(True)
+            rf.write(data)
+            # Carry the local modification time over so later runs can tell
+            # the remote copy is current (see _needs_upload)
+            try:
+                rf.utime((int(local_stat.st_atime), int(local_stat.st_mtime)))
+            except IOError as e:
+                logger.debug("Could not set modification time on %s: %s", remote_file, e)
+    
+    def _needs_upload(self, sftp: paramiko.SFTPClient, local_stat: os.stat_result,
+                      remote_file: str) -> bool:
+        """
+        Check whether a remote file differs from the local one
+        
+        Uploaded files get the local modification time, so a remote file with
+        the same size and mtime is the copy from an earlier run. Exact equality
+        is required, which keeps this independent of clock skew between hosts.
+        
+        Args:
+            sftp: Open SFTP client
+            local_stat: Stat result of the local file
+            remote_file: Path of the file on the remote host
             
         Returns:
-            Dictionary with distribution result
+            True if the file has to be uploaded
         """
-        display_name = host_config.get("display_name")
-        hostname = host_config.get("hostname")
-        port = host_config.get("port", 22)
-        username = host_config.get("username")
-        password_hash = host_config.get("password_hash")
-        cert_path = host_config.get("cert_path")
+        try:
+            remote_stat = sftp.stat(remote_file)
+        except (IOError, OSError):
+            return True
+        return (remote_stat.st_size != local_stat.st_size
+                or remote_stat.st_mtime != int(local_stat.st_mtime))
+    
+    def _map_sftp_channels(self, ssh_client, sftp: paramiko.SFTPClient, func, items: list) -> list:
+        """
+        Call func(sftp_client, item) for each item, running items concurrently
         
-        logger.info(f"Starting distribution to {display_name} ({hostname})")
+        Up to _MAX_SFTP_CHANNELS SFTP channels are used on the same connection,
+        each opened once and shared by the items it runs, so per-file
+        round-trips overlap instead of adding up. Items must not write to the
+        same remote path, since they may run at the same time.
         
-        # We need to store plain password temporarily for connection
-        # In production, consider using SSH keys instead
-        ssh_client = None
-        sftp = None
+        Args:
+            ssh_client: Connected SSH client
+            sftp: Already open SFTP client, used as one of the channels
+            func: Callable taking an SFTP client and an item
+            items: Items to process
+            
+        Returns:
+            Results of func in item order
+        """
+        workers = min(_MAX_SFTP_CHANNELS, len(items))
+        if workers <= 1:
+            return [func(sftp, item) for item in items]
         
+        channels = queue.SimpleQueue()
+        channels.put(sftp)
+        extra_channels = []
         try:
-            # Create SSH client
-            ssh_client = paramiko.SSHClient()
-            # SECURITY NOTE: AutoAddPolicy automatically accepts unknown host keys
-            # This is used for ease of deployment but has security implications.
-            # In production, consider using SSH key-based authentication with known_hosts validation
-            ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # Note: password_hash is actually the hashed password from storage
-            # We can't reverse it, so we need to handle this differently
-            # For now, we'll pass the password directly in the API call
-            # and only hash it for storage
+            for _ in range(workers - 1):
+                channel = ssh_client.open_sftp()
+                extra_channels.append(channel)
+                channels.put(channel)
             
-            # This is a design limitation - we'll need to get the plain password
-            # from the caller when distributing
-            raise ValueError("Cannot retrieve plain password from hash - password must be provided")
+            def run(item):
+                channel = channels.get()
+                try:
+                    return func(channel, item)
+                finally:
+                    channels.put(channel)
             
-        except Exception as e:
-            logger.error(f"Failed to distribute to {display_name}: {e}")
-            return {
-                "host": display_name,
-                "status": "error",
-                "error": str(e)
-            }
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(run, items))
         finally:
-            if sftp:
-                sftp.close()
-            if ssh_client:
-                ssh_client.close()
+            for channel in extra_channels:
+                channel.close()
+    
+    def distribute_to_host(self, host_config: Dict, certificate_files: List[str]) -> Dict:
+        """
+        Distribute certificates to a single host
+        
+        Stored passwords can't be used without decrypting them, so this always
+        fails; use distribute_to_host_with_password instead.
+        
+        Args:
+            host_config: SSH host configuration
+            certificate_files: List of certificate file paths to distribute
+            
+        Returns:
+            Dictionary with distribution result
+        """
+        display_name = host_config.get("display_name")
+        error = "Cannot retrieve plain password from hash - password must be provided"
+        logger.error("Failed to distribute to %s: %s", display_name, error)
+        return {
+            "host": display_name,
+            "status": "error",
+            "error": error
+        }
     
     def distribute_to_host_with_password(self, host_config: Dict, password: str, 
                                         certificate_files: List[str]) -> Dict:
@@ -140,48 +392,72 @@ class SSHDistributor:
             password: Plain text password for SSH connection
             certificate_files: List of certificate file paths to distribute
             
+        Returns:
+            Dictionary with distribution result
+        """
+        return self._distribute_to_host(host_config, password, self._read_local_files(certificate_files))
+    
+    def _read_local_files(self, certificate_files: List[str]) -> List[tuple]:
+        """
+        Read the local certificate files once, dropping any that are missing
+        
+        Certificate files are a few KiB, so their contents are kept in memory
+        and sent to every host rather than re-read per host.
+        
+        Args:
+            certificate_files: List of certificate file paths
+            
+        Returns:
+            List of (path, stat result, contents) for files that exist
+        """
+        local_files = []
+        # A path listed twice is read and uploaded once
+        for local_file in dict.fromkeys(certificate_files):
+            try:
+                with open(local_file, 'rb') as f:
+                    local_files.append((local_file, os.fstat(f.fileno()), f.read()))
+            except OSError:
+                logger.warning("Local file not found: %s", local_file)
+        return local_files
+    
+    def _distribute_to_host(self, host_config: Dict, password: str, local_files: List[tuple]) -> Dict:
+        """
+        Distribute already validated local files to a single host
+        
+        Args:
+            host_config: SSH host configuration
+            password: Plain text password for SSH connection
+            local_files: List of (path, stat result, contents) from _read_local_files
+            
         Returns:
             Dictionary with distribution result
         """
         display_name = host_config.get("display_name")
         hostname = host_config.get("hostname")
-        port = host_config.get("port", 22)
-        username = host_config.get("username")
         cert_path = host_config.get("cert_path")
         use_sudo = host_config.get("use_sudo", False)
         file_overrides = host_config.get("file_overrides", {})
         
-        logger.info(f"Starting distribution to {display_name} ({hostname})")
+        logger.info("Starting distribution to %s (%s)", display_name, hostname)
         
         ssh_client = None
         sftp = None
+        # Private directory on the remote host that sudo uploads are staged in
+        staging_dir = None
         distributed_files = []
+        # (contents, local stat, upload path, destination, file name) keyed by destination
+        uploads = {}
         
         try:
-            # Create SSH client
-            ssh_client = paramiko.SSHClient()
-            # SECURITY NOTE: AutoAddPolicy automatically accepts unknown host keys
-            # This is used for ease of deployment but has security implications.
-            # In production, consider using SSH key-based authentication with known_hosts validation
-            ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # Connect to host
-            ssh_client.connect(
-                hostname=hostname,
-                port=port,
-                username=username,
-                password=password,
-                timeout=30
-            )
+            # Reuse an open connection from an earlier distribution if possible
+            ssh_client = self.ssh_pool.get(display_name, host_config, password, timeout=30)
             
             # Open SFTP session
             sftp = ssh_client.open_sftp()
             
-            # Ensure remote directory exists
-            if use_sudo:
-                # When using sudo, we need to create directory via shell command
-                self._create_remote_directory_with_sudo(ssh_client, cert_path, password)
-            else:
+            # Ensure remote directory exists; with sudo it is created in the
+            # same shell command that installs the files
+            if not use_sudo:
                 try:
                     sftp.stat(cert_path)
                 except FileNotFoundError:
@@ -203,64 +479,71 @@ class SSHDistributor:
                         )
                     raise
             
-            # Upload each certificate file
-            for local_file in certificate_files:
-                if not os.path.exists(local_file):
-                    logger.warning(f"Local file not found: {local_file}")
-                    continue
-                
+            if use_sudo:
+                # With sudo, upload to a fresh directory only this user can
+                # read, then move the files into place
+                staging_dir = f"/tmp/porkbun-sync-{secrets.token_hex(8)}"
+                sftp.mkdir(staging_dir, mode=0o700)
+            
+            # Work out where each certificate file goes. Overrides can map
+            # several files to the same name; as when they were uploaded one
+            # after another, the last one wins
+            for local_file, local_stat, data in local_files:
                 filename = os.path.basename(local_file)
                 
                 # Apply file_overrides if configured for this host
                 if file_overrides:
                     filename = self._apply_file_override(filename, file_overrides)
                 
-                remote_file = os.path.join(cert_path, filename).replace('\\', '/')
-                
-                if use_sudo:
-                    # Upload to temp location first, then move with sudo
-                    temp_file = f"/tmp/{filename}"
-                    sftp.put(local_file, temp_file)
-                    
-                    # Move file with sudo
-                    move_cmd = f"sudo mv {temp_file} {remote_file}"
-                    stdin, stdout, stderr = ssh_client.exec_command(move_cmd, get_pty=True)
-                    
-                    # Send password if sudo asks for it
-                    if stdin.channel.send_ready():
-                        stdin.write(password + '\n')
-                        stdin.flush()
-                    
-                    # Wait for command to complete
-                    exit_status = stdout.channel.recv_exit_status()
-                    if exit_status != 0:
-                        error_output = stderr.read().decode()
-                        logger.error(f"Failed to move file with sudo: {error_output}")
-                        continue
-                    
-                    # Set proper permissions with sudo
-                    chmod_cmd = f"sudo chmod 644 {remote_file}"
-                    stdin, stdout, stderr = ssh_client.exec_command(chmod_cmd, get_pty=True)
-                    if stdin.channel.send_ready():
-                        stdin.write(password + '\n')
-                        stdin.flush()
-                    stdout.channel.recv_exit_status()
-                else:
-                    # Upload file directly (overwrites if exists)
-                    try:
-                        sftp.put(local_file, remote_file)
-                    except (PermissionError, IOError, OSError) as e:
-                        if self._is_permission_error(e):
-                            raise PermissionError(
-                                f"Permission denied writing to {remote_file}. "
-                                f"Try setting 'use_sudo: true' in the SSH host configuration for {display_name}."
-                            )
-                        raise
+                remote_file = posixpath.join(cert_path, filename)
+                upload_path = posixpath.join(staging_dir, filename) if use_sudo else remote_file
+                uploads.pop(remote_file, None)
+                uploads[remote_file] = (data, local_stat, upload_path, remote_file, filename)
+            uploads = list(uploads.values())
+            
+            def upload(sftp_client, entry):
+                data, local_stat, upload_path, remote_file, filename = entry
+                if not self._needs_upload(sftp_client, local_stat, remote_file):
+                    logger.info("Skipped %s on %s (up-to-date)", filename, display_name)
+                    return False
+                try:
+                    # Overwrites the remote file if it exists
+                    self._sftp_upload(sftp_client, data, local_stat, upload_path)
+                except (PermissionError, IOError, OSError) as e:
+                    if not use_sudo and self._is_permission_error(e):
+                        raise PermissionError(
+                            f"Permission denied writing to {remote_file}. "
+                            f"Try setting 'use_sudo: true' in the SSH host configuration for {display_name}."
+                        )
+                    raise
+                logger.info("Uploaded %s to %s:%s", filename, display_name, remote_file)
+                return True
+            
+            uploaded = self._map_sftp_channels(ssh_client, sftp, upload, uploads)
+            
+            # Up-to-date files are already in place and count as distributed
+            distributed_files.extend(filename for *_, filename in uploads)
+            moves = [entry for entry, changed in zip(uploads, uploaded) if changed]
+            
+            if use_sudo and moves:
+                # One sudo shell for the directory and every file instead of
+                # a separate command (and channel) per step
+                quoted_path = shlex.quote(cert_path)
+                commands = [f"mkdir -p {quoted_path}", f"chmod 755 {quoted_path}"]
+                for _, _, temp_file, remote_file, _ in moves:
+                    quoted_remote = shlex.quote(remote_file)
+                    commands.append(f"mv {shlex.quote(temp_file)} {quoted_remote}")
+                    commands.append(f"chmod 644 {quoted_remote}")
                 
-                distributed_files.append(filename)
-                logger.info(f"Uploaded {filename} to {display_name}:{remote_file}")
+                # The staging directory is removed whether or not every step succeeded
+                command = (f"{{ {' && '.join(commands)}; }}; status=$?; "
+                           f"rm -rf {shlex.quote(staging_dir)}; exit $status")
+                exit_status, error_output = self._run_sudo(ssh_client, command, password)
+                staging_dir = None
+                if exit_status != 0:
+                    raise Exception(f"Failed to install files with sudo: {error_output}")
             
-            logger.info(f"Successfully distributed {len(distributed_files)} files to {display_name}")
+            logger.info("Successfully distributed %s files to %s", len(distributed_files), display_name)
             
             return {
                 "host": display_name,
@@ -270,84 +553,102 @@ class SSHDistributor:
             }
             
         except paramiko.AuthenticationException as e:
-            logger.error(f"Authentication failed for {display_name}: {e}")
+            logger.error("Authentication failed for %s: %s", display_name, e)
             return {
                 "host": display_name,
                 "status": "error",
                 "error": "Authentication failed"
             }
         except paramiko.SSHException as e:
-            logger.error(f"SSH error for {display_name}: {e}")
+            logger.error("SSH error for %s: %s", display_name, e)
+            self.ssh_pool.evict(display_name)
             return {
                 "host": display_name,
                 "status": "error",
                 "error": f"SSH connection error: {str(e)}"
             }
         except Exception as e:
-            logger.error(f"Failed to distribute to {display_name}: {e}")
+            logger.error("Failed to distribute to %s: %s", display_name, e)
+            if not isinstance(e, PermissionError):
+                # The connection may be broken; don't hand it out again
+                self.ssh_pool.evict(display_name)
             return {
                 "host": display_name,
                 "status": "error",
                 "error": str(e)
             }
         finally:
+            # The client itself stays open in the pool for the next run
             if sftp:
+                if staging_dir:
+                    self._remove_staging_directory(sftp, staging_dir)
                 sftp.close()
-            if ssh_client:
-                ssh_client.close()
     
     def _create_remote_directory(self, sftp, path: str):
         """
         Recursively create remote directory
         
+        Tries the deepest directory first and only walks up while parents
+        are missing, so the usual case of one missing level is one round-trip.
+        
         Args:
             sftp: SFTP client
             path: Remote directory path
         """
-        dirs = []
+        missing = []
         while path and path != '/':
-            dirs.append(path)
-            path = os.path.dirname(path)
-        
-        dirs.reverse()
-        
-        for directory in dirs:
             try:
-                sftp.stat(directory)
+                sftp.mkdir(path)
+                break
             except FileNotFoundError:
-                sftp.mkdir(directory)
+                # Parent doesn't exist yet; create it first
+                missing.append(path)
+                path = posixpath.dirname(path)
+        
+        for directory in reversed(missing):
+            sftp.mkdir(directory)
     
-    def _create_remote_directory_with_sudo(self, ssh_client, path: str, password: str):
+    def _remove_staging_directory(self, sftp, path: str):
         """
-        Create remote directory using sudo
+        Remove a staging directory and any files left in it, ignoring errors
         
         Args:
-            ssh_client: SSH client
+            sftp: SFTP client
             path: Remote directory path
+        """
+        try:
+            for name in sftp.listdir(path):
+                sftp.remove(posixpath.join(path, name))
+            sftp.rmdir(path)
+        except (IOError, OSError) as e:
+            logger.warning("Could not remove staging directory %s: %s", path, e)
+    
+    def _run_sudo(self, ssh_client, command: str, password: str) -> tuple:
+        """
+        Run a shell command on the remote host with sudo
+        
+        Args:
+            ssh_client: SSH client
+            command: Shell command to run as root
             password: Password for sudo
+            
+        Returns:
+            Tuple of exit status and error output
         """
-        # Create directory with sudo
-        mkdir_cmd = f"sudo mkdir -p {path}"
-        stdin, stdout, stderr = ssh_client.exec_command(mkdir_cmd, get_pty=True)
+        # -S reads the password from stdin, so no PTY is needed; -p '' keeps
+        # the prompt out of the error output
+        sudo_cmd = f"sudo -S -p '' sh -c {shlex.quote(command)}"
+        stdin, stdout, stderr = ssh_client.exec_command(sudo_cmd)
         
-        # Send password if sudo asks for it
-        if stdin.channel.send_ready():
-            stdin.write(password + '\n')
-            stdin.flush()
+        # Always send the password; with NOPASSWD it goes unread by the command
+        stdin.write(password + '\n')
+        stdin.flush()
+        stdin.channel.shutdown_write()
         
         # Wait for command to complete
         exit_status = stdout.channel.recv_exit_status()
-        if exit_status != 0:
-            error_output = stderr.read().decode()
-            raise Exception(f"Failed to create directory with sudo: {error_output}")
-        
-        # Set permissions so we can write to it
-        chmod_cmd = f"sudo chmod 755 {path}"
-        stdin, stdout, stderr = ssh_client.exec_command(chmod_cmd, get_pty=True)
-        if stdin.channel.send_ready():
-            stdin.write(password + '\n')
-            stdin.flush()
-        stdout.channel.recv_exit_status()
+        error_output = stderr.read().decode() if exit_status != 0 else ""
+        return exit_status, error_output
     
     def distribute_to_all_hosts(self, certificate_files: List[str]) -> List[Dict]:
         """
@@ -366,26 +667,84 @@ class SSHDistributor:
             logger.info("No SSH hosts configured")
             return results
         
-        logger.info(f"Distributing certificates to {len(hosts)} hosts")
+        logger.info("Distributing certificates to %s hosts", len(hosts))
+        
+        # Read the local files once rather than once per host
+        local_files = self._read_local_files(certificate_files)
         
-        for host in hosts:
+        # The same host listed under several names would get the same files
+        # at the same paths; upload to it once and share the result
+        target_keys = [self._target_key(host) for host in hosts]
+        target_index = {}
+        targets = []
+        for host, key in zip(hosts, target_keys):
+            if key not in target_index:
+                target_index[key] = len(targets)
+                targets.append(host)
+        
+        # Hosts are independent and each upload is network-bound, so run
+        # them concurrently; results keep the configured host order
+        workers = min(_MAX_DISTRIBUTION_WORKERS, len(targets))
+        distribute = functools.partial(self._distribute_one, local_files=local_files)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                target_results = list(executor.map(distribute, targets))
+        else:
+            target_results = list(map(distribute, targets))
+        
+        for host, key in zip(hosts, target_keys):
+            result = target_results[target_index[key]]
             display_name = host.get("display_name")
-            
-            # Get decrypted password
-            password = self.ssh_config.get_decrypted_password(display_name)
-            
-            if not password:
-                logger.error(f"Could not retrieve password for {display_name}")
-                result = {
-                    "host": display_name,
-                    "status": "error",
-                    "error": "Could not decrypt password - encryption key may have changed"
-                }
-                results.append(result)
-                continue
-            
-            # Distribute to this host
-            result = self.distribute_to_host_with_password(host, password, certificate_files)
+            if result["host"] != display_name:
+                logger.info("%s is the same target as %s; not uploading again", display_name, result["host"])
+                result = {**result, "host": display_name}
             results.append(result)
         
         return results
+    
+    @staticmethod
+    def _target_key(host: Dict) -> tuple:
+        """
+        Identify where a host's files end up, ignoring its display name
+        
+        Args:
+            host: SSH host configuration
+            
+        Returns:
+            Tuple that is equal for hosts receiving identical uploads
+        """
+        return (
+            (host.get("hostname") or "").lower(),
+            host.get("port", 22),
+            host.get("username"),
+            posixpath.normpath(host.get("cert_path") or "."),
+            bool(host.get("use_sudo", False)),
+            tuple(sorted((host.get("file_overrides") or {}).items()))
+        )
+    
+    def _distribute_one(self, host: Dict, local_files: List[tuple]) -> Dict:
+        """
+        Distribute certificates to one configured host using its stored password
+        
+        Args:
+            host: SSH host configuration
+            local_files: List of (path, stat result, contents) from _read_local_files
+            
+        Returns:
+            Dictionary with distribution result
+        """
+        display_name = host.get("display_name")
+        
+        # Get decrypted password
+        password = self.ssh_config.get_decrypted_password(display_name)
+        
+        if not password:
+            logger.error("Could not retrieve password for %s", display_name)
+            return {
+                "host": display_name,
+                "status": "error",
+                "error": "Could not decrypt password - encryption key may have changed"
+            }
+        
+        # Distribute to this host
+        return self._distribute_to_host(host, password, local_files)
@@ -208,11 +208,16 @@ document.getElementById('api-form').addEventListener('submit', async (e) => {
     };
     
     try {
-        const response = await fetch('/api/settings/api', {
+        // Save and test against Porkbun in parallel
+        const request = {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(data)
-        });
+        };
+        const [response, testResponse] = await Promise.all([
+            fetch('/api/settings/api', request),
+            fetch('/api/settings/api/test', request)
+        ]);
         
         const result = await response.json();
         
@@ -224,6 +229,11 @@ document.getElementById('api-form').addEventListener('submit', async (e) => {
         document.getElementById('secret_key').value = '';
         document.getElementById('secret_key').placeholder = '(hidden)';
         
+        const testResult = await testResponse.json();
+        if (!testResponse.ok) {
+            showNotification('Credentials saved, but the Porkbun API test failed: ' + (testResult.error || 'Unknown error'), 'error');
+        }
+        
     } catch (error) {
         console.error('Error:', error);
         showNotification(error.message, 'error');
@@ -480,6 +490,26 @@ async function triggerSync() {
             throw new Error(result.error);
         }
         
+        // The sync runs in the background; poll until it finishes
+        let status;
+        do {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const statusResponse = await fetch('/api/sync/status');
+            status = await statusResponse.json();
+            if (status.error) {
+                throw new Error(status.error);
+            }
+        } while (status.running);
+        
+        if (status.sync_error) {
+            throw new Error(status.sync_error);
+        }
+        
+        if (status.sync_skipped) {
+            showNotification('Sync skipped: another sync is already running', 'warning');
+            return;
+        }
+        
         showNotification('Sync completed successfully');
         loadSyncStatus();
         
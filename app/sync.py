@@ -2,19 +2,31 @@
 Certificate synchronization and scheduling
 """
 import logging
-from datetime import datetime
-from typing import List, Dict
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Dict, Optional
+from apscheduler.executors.pool import ThreadPoolExecutor as SchedulerThreadPool
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from .porkbun_api import PorkbunAPI
 from .certificate_manager import CertificateManager
 from .config import Config
 from .ssh_config import SSHConfig
-from .ssh_distribution import SSHDistributor
 from .distribution_log import DistributionLog
 
+if TYPE_CHECKING:
+    from .ssh_distribution import SSHDistributor, SSHConnectionPool
+
 logger = logging.getLogger(__name__)
 
+# Upper bound on domains synced concurrently, kept low for the API's rate limits
+_MAX_SYNC_WORKERS = 8
+
+# Days of validity left below which a saved certificate is fetched again
+DEFAULT_RENEWAL_THRESHOLD_DAYS = 30
+
 
 class CertificateSync:
     """Handles certificate synchronization from Porkbun"""
@@ -27,25 +39,159 @@ class CertificateSync:
             config: Configuration manager
         """
         self.config = config
-        self.scheduler = BackgroundScheduler()
+        # The only job is the sync, so one worker thread is enough; it runs
+        # in-process because sync_all updates status, logs and pooled clients
+        self.scheduler = BackgroundScheduler(executors={'default': SchedulerThreadPool(max_workers=1)})
         self.sync_status = {
             "last_sync": None,
             "status": "idle",
             "results": []
         }
-        self.ssh_config = SSHConfig(config)
-        self.ssh_distributor = SSHDistributor(self.ssh_config)
-        self.distribution_log = DistributionLog()
+        # SSH support and the distribution log are built on first use, so
+        # startup doesn't load them (or import paramiko) before they're needed
+        self._ssh_config: Optional[SSHConfig] = None
+        self._ssh_pool: Optional["SSHConnectionPool"] = None
+        self._ssh_distributor: Optional["SSHDistributor"] = None
+        self._distribution_log: Optional[DistributionLog] = None
+        self._lazy_lock = threading.RLock()
+        
+        # Certificate manager reused across syncs while the output directory is unchanged
+        self._cert_manager: Optional[CertificateManager] = None
+        
+        # API client reused across syncs while the credentials are unchanged
+        self._api: Optional[PorkbunAPI] = None
+        self._api_lock = threading.Lock()
+        # Held for the duration of a sync so runs never overlap
+        self._sync_lock = threading.Lock()
+        
+        # Distribution runs on its own thread so a sync finishes once the
+        # certificates are on disk. Files queued while a distribution is
+        # running are merged and sent together in the next one.
+        self._distribution_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='distribution')
+        self._pending_distribution: Dict[str, None] = {}
+        self._distribution_scheduled = False
+        self._distribution_lock = threading.Lock()
+    
+    @property
+    def ssh_config(self) -> SSHConfig:
+        """SSH host configuration manager"""
+        if self._ssh_config is None:
+            with self._lazy_lock:
+                if self._ssh_config is None:
+                    self._ssh_config = SSHConfig(self.config)
+        return self._ssh_config
+    
+    @property
+    def ssh_pool(self) -> "SSHConnectionPool":
+        """Pool of open SSH connections shared by distribution and connection tests"""
+        if self._ssh_pool is None:
+            with self._lazy_lock:
+                if self._ssh_pool is None:
+                    from .ssh_distribution import SSHConnectionPool
+                    self._ssh_pool = SSHConnectionPool()
+        return self._ssh_pool
+    
+    @property
+    def ssh_distributor(self) -> "SSHDistributor":
+        """Certificate distributor for the configured SSH hosts"""
+        if self._ssh_distributor is None:
+            with self._lazy_lock:
+                if self._ssh_distributor is None:
+                    from .ssh_distribution import SSHDistributor
+                    self._ssh_distributor = SSHDistributor(self.ssh_config, self.ssh_pool)
+        return self._ssh_distributor
+    
+    @property
+    def distribution_log(self) -> DistributionLog:
+        """Log of sync and distribution events"""
+        if self._distribution_log is None:
+            with self._lazy_lock:
+                if self._distribution_log is None:
+                    self._distribution_log = DistributionLog()
+        return self._distribution_log
     
-    def sync_all(self) -> Dict:
+    @property
+    def api(self) -> PorkbunAPI:
+        """API client for the configured credentials, kept warm across calls"""
+        return self._get_api(*self.config.get_api_credentials())
+    
+    def _get_api(self, api_key: str, secret_key: str) -> PorkbunAPI:
+        """
+        Get the API client, switching it over if the credentials changed
+        
+        Args:
+            api_key: Porkbun API key
+            secret_key: Porkbun secret key
+            
+        Returns:
+            PorkbunAPI client for the given credentials
+        """
+        # Request threads and the sync thread can get here at the same time
+        with self._api_lock:
+            api = self._api
+            if api is None:
+                api = self._api = PorkbunAPI(api_key, secret_key)
+            elif api.api_key != api_key or api.secret_key != secret_key:
+                # A sync may still be using the old client, so build a new one
+                # rather than changing it; the pooled connections are shared
+                api = self._api = api.with_credentials(api_key, secret_key)
+            return api
+    
+    def _get_cert_manager(self, output_dir: str) -> CertificateManager:
+        """
+        Get the certificate manager, replacing it if the output directory changed
+        
+        Args:
+            output_dir: Directory to store certificates
+            
+        Returns:
+            CertificateManager writing to output_dir
+        """
+        cert_manager = self._cert_manager
+        if cert_manager is None or cert_manager.output_dir != output_dir:
+            cert_manager = self._cert_manager = CertificateManager(output_dir)
+        return cert_manager
+    
+    def sync_all(self, force: bool = False) -> Dict:
         """
         Sync all configured domains
         
+        Domains whose saved certificate is valid for longer than the
+        configured renewal threshold are skipped unless force is set. Only
+        one sync runs at a time; a call made while another is running
+        returns straight away.
+        
+        Args:
+            force: Retrieve every certificate regardless of the saved ones
+            
+        Returns:
+            Dictionary with sync results
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            logger.warning("Certificate sync already running; skipping this run")
+            return {
+                "status": "skipped",
+                "reason": "already running"
+            }
+        try:
+            return self._sync_all(force)
+        finally:
+            self._sync_lock.release()
+    
+    def _sync_all(self, force: bool) -> Dict:
+        """
+        Sync all configured domains while holding the sync lock
+        
+        Args:
+            force: Retrieve every certificate regardless of the saved ones
+            
         Returns:
             Dictionary with sync results
         """
         logger.info("Starting certificate sync for all domains")
-        self.sync_status["status"] = "running"
+        # Status is only ever replaced, never mutated, so readers always
+        # see a consistent snapshot
+        self.sync_status = {**self.sync_status, "status": "running"}
         results = []
         
         try:
@@ -54,8 +200,8 @@ class CertificateSync:
             if not api_key or not secret_key:
                 raise ValueError("API credentials not configured")
             
-            # Initialize API client
-            api = PorkbunAPI(api_key, secret_key)
+            # Get API client
+            api = self._get_api(api_key, secret_key)
             
             # Test API connection
             if not api.ping():
@@ -63,86 +209,62 @@ class CertificateSync:
             
             # Get certificate configuration
             cert_config = self.config.get_certificate_config()
-            cert_manager = CertificateManager(cert_config.get("output_dir", "/app/certificates"))
+            cert_manager = self._get_cert_manager(cert_config.get("output_dir", "/app/certificates"))
             formats = cert_config.get("formats", ["pem"])
+            threshold_days = cert_config.get("renewal_threshold_days", DEFAULT_RENEWAL_THRESHOLD_DAYS)
+            renew_before = None if force or not threshold_days else timedelta(days=threshold_days)
             
             # Sync each domain
             domains = self.config.get_domains()
-            for domain_config in domains:
-                domain = domain_config.get("domain")
-                custom_name = domain_config.get("custom_name", domain)
-                separator = domain_config.get("separator", "_")
-                alt_file_names = domain_config.get("alt_file_names", [])
-                
-                try:
-                    logger.info(f"Syncing certificate for {domain}")
-                    
-                    # Retrieve certificate
-                    cert_chain, private_key, public_key = api.retrieve_ssl_bundle(domain)
-                    
-                    # Save certificate
-                    saved_files = cert_manager.save_certificate(
-                        domain,
-                        cert_chain,
-                        private_key,
-                        public_key,
-                        custom_name,
-                        formats,
-                        separator,
-                        alt_file_names
-                    )
-                    
-                    results.append({
-                        "domain": domain,
-                        "status": "success",
-                        "files": list(saved_files.values())
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Failed to sync {domain}: {e}")
-                    results.append({
-                        "domain": domain,
-                        "status": "error",
-                        "error": str(e)
-                    })
             
-            self.sync_status["last_sync"] = datetime.now().isoformat()
-            self.sync_status["status"] = "completed"
-            self.sync_status["results"] = results
+            # Each domain is fetched and saved independently; overlap the
+            # API round trips and file writes, keeping results in domain order
+            sync_one = functools.partial(self._sync_domain, api, cert_manager,
+                                         formats=formats, renew_before=renew_before)
+            workers = min(_MAX_SYNC_WORKERS, len(domains))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results.extend(executor.map(sync_one, domains))
+            else:
+                results.extend(map(sync_one, domains))
+            
+            # Stamped once per sync, in UTC with an offset so browsers show it in local time
+            self.sync_status = {
+                "last_sync": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                "status": "completed",
+                "results": results
+            }
+            
+            # Count outcomes and collect current certificate files in one pass
+            successful_count = skipped_count = failed_count = 0
+            certificate_files = []
+            for result in results:
+                status = result['status']
+                if status == 'success':
+                    successful_count += 1
+                elif status == 'skipped':
+                    skipped_count += 1
+                else:
+                    failed_count += 1
+                    continue
+                certificate_files.extend(result.get('files', ()))
             
-            successful_count = len([r for r in results if r['status'] == 'success'])
-            failed_count = len([r for r in results if r['status'] == 'error'])
-            logger.info(f"Certificate sync completed. {successful_count} succeeded, {failed_count} failed")
+            logger.info("Certificate sync completed. %d succeeded, %d skipped, %d failed", successful_count, skipped_count, failed_count)
             
-            # Log the sync event
-            sync_status = "success" if successful_count > 0 and failed_count == 0 else "partial" if successful_count > 0 else "error"
+            # Log the sync event; skipped domains already have current certificates
+            current_count = successful_count + skipped_count
+            sync_status = "success" if current_count > 0 and failed_count == 0 else "partial" if current_count > 0 else "error"
             self.distribution_log.add_sync_event(
                 domains=[d.get("domain") for d in domains],
                 status=sync_status,
                 results=results
             )
             
-            # If any certificates were successfully synced, distribute them to SSH hosts
-            if successful_count > 0:
-                logger.info("Starting certificate distribution to SSH hosts")
-                
-                # Collect all successfully saved certificate files
-                certificate_files = []
-                for result in results:
-                    if result['status'] == 'success' and 'files' in result:
-                        certificate_files.extend(result['files'])
-                
-                if certificate_files:
-                    # Distribute certificates to all configured SSH hosts
-                    distribution_results = self.ssh_distributor.distribute_to_all_hosts(certificate_files)
-                    
-                    # Log distribution results
-                    if distribution_results:
-                        self.distribution_log.add_bulk_distribution_event(distribution_results)
-                        
-                        dist_success = len([r for r in distribution_results if r['status'] == 'success'])
-                        dist_failed = len([r for r in distribution_results if r['status'] == 'error'])
-                        logger.info(f"Distribution completed. {dist_success} succeeded, {dist_failed} failed")
+            # Distribute current certificates to SSH hosts, if any are
+            # configured. Skipped domains are included so new or out-of-date
+            # hosts catch up; files a host already has are not uploaded again
+            if certificate_files and self.ssh_config.get_ssh_hosts():
+                self._queue_distribution(certificate_files)
             
             return {
                 "status": "success",
@@ -150,13 +272,120 @@ class CertificateSync:
             }
             
         except Exception as e:
-            logger.error(f"Certificate sync failed: {e}")
-            self.sync_status["status"] = "error"
+            logger.error("Certificate sync failed: %s", e)
+            self.sync_status = {**self.sync_status, "status": "error"}
             return {
                 "status": "error",
                 "error": str(e)
             }
     
+    def _sync_domain(self, api: PorkbunAPI, cert_manager: CertificateManager,
+                     domain_config: Dict, formats: List[str],
+                     renew_before: Optional[timedelta] = None) -> Dict:
+        """
+        Retrieve and save the certificate for one domain
+        
+        Args:
+            api: Porkbun API client
+            cert_manager: Certificate manager writing to the output directory
+            domain_config: Domain configuration
+            formats: List of formats to save
+            renew_before: Skip the domain if its saved certificate is valid for
+                longer than this; None always retrieves it
+            
+        Returns:
+            Dictionary with the domain's sync result
+        """
+        domain = domain_config.get("domain")
+        custom_name = domain_config.get("custom_name", domain)
+        separator = domain_config.get("separator", "_")
+        alt_file_names = domain_config.get("alt_file_names", [])
+        
+        try:
+            if renew_before is not None:
+                current_files = cert_manager.get_current_files(
+                    domain,
+                    custom_name,
+                    formats,
+                    separator,
+                    alt_file_names,
+                    min_validity=renew_before
+                )
+                if current_files is not None:
+                    logger.info("Skipping %s: saved certificate is not due for renewal", domain)
+                    return {
+                        "domain": domain,
+                        "status": "skipped",
+                        "files": list(current_files.values())
+                    }
+            
+            logger.info("Syncing certificate for %s", domain)
+            
+            # Retrieve certificate
+            cert_chain, private_key, public_key = api.retrieve_ssl_bundle(domain)
+            
+            # Save certificate
+            saved_files = cert_manager.save_certificate(
+                domain,
+                cert_chain,
+                private_key,
+                public_key,
+                custom_name,
+                formats,
+                separator,
+                alt_file_names
+            )
+            
+            return {
+                "domain": domain,
+                "status": "success",
+                "files": list(saved_files.values())
+            }
+            
+        except Exception as e:
+            logger.error("Failed to sync %s: %s", domain, e)
+            return {
+                "domain": domain,
+                "status": "error",
+                "error": str(e)
+            }
+    
+    def _queue_distribution(self, certificate_files: List[str]):
+        """
+        Queue certificates for distribution to all SSH hosts in the background
+        
+        Args:
+            certificate_files: List of certificate file paths to distribute
+        """
+        with self._distribution_lock:
+            self._pending_distribution.update(dict.fromkeys(certificate_files))
+            if self._distribution_scheduled:
+                # The running distribution picks these up when it finishes
+                return
+            self._distribution_scheduled = True
+        self._distribution_executor.submit(self._run_queued_distributions)
+    
+    def _run_queued_distributions(self):
+        """Distribute queued certificates until nothing is left to send"""
+        while True:
+            with self._distribution_lock:
+                if not self._pending_distribution:
+                    self._distribution_scheduled = False
+                    return
+                certificate_files = list(self._pending_distribution)
+                self._pending_distribution.clear()
+            
+            try:
+                distribution_results = self.distribute_certificates(certificate_files)
+            except Exception as e:
+                logger.error("Certificate distribution failed: %s", e)
+                continue
+            
+            if distribution_results:
+                dist_success = sum(1 for r in distribution_results if r['status'] == 'success')
+                dist_failed = len(distribution_results) - dist_success
+                logger.info("Distribution completed. %d succeeded, %d failed", dist_success, dist_failed)
+    
     def start_scheduler(self):
         """Start the scheduler for automatic syncs"""
         schedule_config = self.config.get_schedule_config()
@@ -177,22 +406,29 @@ class CertificateSync:
                 CronTrigger.from_crontab(cron_expr),
                 id='cert_sync',
                 name='Certificate Sync',
-                replace_existing=True
+                replace_existing=True,
+                # Never stack runs: one at a time, and runs missed while the
+                # container was paused collapse into a single catch-up run
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=3600
             )
             
             if not self.scheduler.running:
                 self.scheduler.start()
             
-            logger.info(f"Scheduler started with cron: {cron_expr}")
+            logger.info("Scheduler started with cron: %s", cron_expr)
             
         except Exception as e:
-            logger.error(f"Failed to start scheduler: {e}")
+            logger.error("Failed to start scheduler: %s", e)
             raise
     
     def stop_scheduler(self):
         """Stop the scheduler"""
         if self.scheduler.running:
             self.scheduler.shutdown()
+            # Pooled SSH clients stay open: distributions and connection
+            # tests may still be using them, and the pool closes itself at exit
             logger.info("Scheduler stopped")
     
     def get_status(self) -> Dict:
@@ -213,6 +449,7 @@ class CertificateSync:
         results = self.ssh_distributor.distribute_to_all_hosts(certificate_files)
         
         # Log the distribution event
-        self.distribution_log.add_bulk_distribution_event(results)
+        if results:
+            self.distribution_log.add_bulk_distribution_event(results)
         
         return results
@@ -0,0 +1,14 @@
+"""
+Gunicorn configuration for Porkbun Certificate Sync
+"""
+bind = "0.0.0.0:5000"
+
+# A single worker keeps the scheduler, sync status and logs in one process;
+# its thread pool serves requests concurrently
+workers = 1
+worker_class = "gthread"
+threads = 8
+
+# Keep browser connections open between status polls
+keepalive = 15
+timeout = 120